@@ -0,0 +1,215 @@
+"""Решение задачи "коммивояжера" имитацией отжига с ограничением по времени.
+Алгоритм "в любой момент" (anytime): его можно остановить когда угодно, и лучший
+найденный маршрут всегда доступен через get_best, в том числе из другого потока.
+Останавливается по истечении бюджета времени, по числу итераций или по сигналу отмены
+(любой объект с методом is_set, например threading.Event). С заданным интервалом
+вызывается функция обратного вызова со сведениями о ходе поиска.
+Длина лучшего маршрута отслеживается на каждом ходе, а сам маршрут копируется (за O(n))
+только при уходе из лучшего состояния и не чаще интервала обратного вызова на проверках,
+поэтому частые улучшения не замедляют ход.
+Ход - 2-opt между точкой и одним из ее ближайших соседей, изменение длины
+считается за O(1) по четырем дугам. Температура снижается геометрически
+от начальной к конечной по мере расходования бюджета."""
+
+
+import math
+import random
+import time
+
+from bound import calculate_gap, calculate_lower_bound, format_gap_string
+from construction import create_greedy_route
+from distance import (calculate_route_length, calculate_route_lengths, create_coordinate_distance,
+                      create_distance_matrix, points_to_array)
+from local_search import TWO_LEVEL_THRESHOLD, find_nearest_neighbours
+from postman_2 import format_result_string
+from stats import SearchStats, measure_phase
+from tour import TourArray, TwoLevelTour
+
+
+# Через сколько итераций проверяются часы, отмена и обратный вызов:
+CHECK_INTERVAL = 256
+
+# Количество итераций на точку, если не задан бюджет времени:
+ITERATIONS_PER_POINT = 100
+
+
+class AnnealingSolver:
+    """Имитация отжига над маршрутом по координатам точек"""
+
+    def __init__(self, points, route=None, k=10, seed=None):
+        """
+        :param points: словарь точек или массив координат n x 2
+        :param route: начальный маршрут (по умолчанию - жадное построение по дугам)
+        :param k: количество ближайших соседей - кандидатов для ходов
+        :param seed: начальное значение генератора случайных чисел
+        """
+        self.coords = points_to_array(points)
+        self.n = len(self.coords)
+        if route is None:
+            route = create_greedy_route(self.coords)[0]
+        route = [int(x) for x in route]
+        self.dist = create_coordinate_distance(self.coords)
+        self.neighbours = find_nearest_neighbours(self.coords, k).tolist() if self.n > 1 else [[]]
+        self.random = random.Random(seed)
+        tour_class = TwoLevelTour if self.n >= TWO_LEVEL_THRESHOLD else TourArray
+        self.tour = tour_class(route)
+        self.length = calculate_route_length(self.coords, route)
+        self.best = (self.tour.to_list(), self.length)
+        self.iterations = 0
+
+    def get_best(self):
+        """
+        Возвращает лучший найденный на данный момент маршрут и его длину
+        :rtype: (list, float)
+        """
+        return self.best
+
+    def get_result(self):
+        """
+        Возвращает лучший маршрут в формате функции format_result_string
+        :rtype: list
+        """
+        route, _ = self.best
+        lengths = calculate_route_lengths(self.coords, route).tolist()
+        return [tuple(route)] + lengths + [sum(lengths)]
+
+    def run(self, time_limit=None, max_iterations=None, cancel=None, callback=None, interval=1.0,
+            start_temperature=None, end_temperature=None, lower_bound=None, tolerance=0.0, stats=None):
+        """
+        Выполняет отжиг, пока не истечет время, не закончатся итерации или не придет сигнал отмены.
+        Если не задано ни время, ни количество итераций, выполняется ITERATIONS_PER_POINT * n итераций.
+        :param time_limit: бюджет времени в секундах
+        :param max_iterations: наибольшее количество итераций
+        :param cancel: сигнал отмены - объект с методом is_set()
+        :param callback: функция, которой передается словарь со сведениями о ходе поиска
+        :param interval: интервал вызова callback в секундах; не реже этого интервала лучший
+            маршрут, доступный через get_best, обновляется во время поиска
+        :param start_temperature: начальная температура (по умолчанию - треть средней длины дуги);
+            при нулевой температуре принимаются только улучшающие ходы
+        :param end_temperature: конечная температура (по умолчанию - тысячная средней длины дуги)
+        :param lower_bound: нижняя оценка длины маршрута (см. bound.calculate_lower_bound)
+        :param tolerance: допустимое отклонение от нижней оценки, при достижении которого поиск прекращается
+        :param stats: объект SearchStats для сбора статистики (модуль stats)
+        :return: лучший маршрут и его длина
+        :rtype: (list, float)
+        """
+        # Маршрут нулевой длины (все точки совпадают) уже оптимален:
+        if self.n < 4 or self.length == 0:
+            return self.best
+        if time_limit is None and max_iterations is None:
+            max_iterations = ITERATIONS_PER_POINT * self.n
+        mean_edge = self.length / self.n
+        t_start = mean_edge / 3 if start_temperature is None else start_temperature
+        t_end = mean_edge / 1000 if end_temperature is None else end_temperature
+        if t_start < 0 or t_end < 0:
+            raise ValueError('Температура не может быть отрицательной')
+        # Геометрическое охлаждение возможно только между положительными температурами:
+        geometric = t_start > 0 and t_end > 0
+        tour, dist, neighbours, rnd = self.tour, self.dist, self.neighbours, self.random
+        n, k = self.n, len(self.neighbours[0])
+        started = time.perf_counter()
+        last_report = started
+        temperature = t_start
+        done = 0
+        best_length = recorded = self.best[1]
+        # Текущий маршрут - лучший, но еще не скопирован в self.best:
+        pending = False
+        last_saved = started
+        if stats is not None:
+            stats.record_bound(recorded)
+        while True:
+            for _ in range(CHECK_INTERVAL):
+                a = int(rnd.random() * n)
+                c = neighbours[a][int(rnd.random() * k)]
+                if rnd.random() < 0.5:
+                    b, d = tour.next(a), tour.next(c)
+                else:
+                    b, d = tour.prev(a), tour.prev(c)
+                if c == b or d == a:
+                    continue
+                delta = dist(a, c) + dist(b, d) - dist(a, b) - dist(c, d)
+                if delta < 0 or (temperature > 0 and rnd.random() < math.exp(-delta / temperature)):
+                    # Ход уводит из лучшего состояния - сохраняем его:
+                    if pending and self.length + delta >= best_length - 1e-10:
+                        self.best = (tour.to_list(), best_length)
+                        pending = False
+                    tour.make_2opt(a, b, c, d)
+                    self.length += delta
+                    if self.length < best_length - 1e-10:
+                        best_length = self.length
+                        pending = True
+            done += CHECK_INTERVAL
+            self.iterations += CHECK_INTERVAL
+            if stats is not None and best_length < recorded:
+                recorded = best_length
+                stats.record_bound(recorded)
+            now = time.perf_counter()
+            if pending and now - last_saved >= interval:
+                self.best = (tour.to_list(), best_length)
+                pending = False
+                last_saved = now
+            progress = 0.0
+            if time_limit is not None:
+                progress = (now - started) / time_limit if time_limit > 0 else 1.0
+            if max_iterations is not None:
+                progress = max(progress, done / max_iterations)
+            if callback is not None and now - last_report >= interval:
+                last_report = now
+                callback({
+                    'elapsed': now - started,
+                    'iterations': self.iterations,
+                    'temperature': temperature,
+                    'length': self.length,
+                    'best_length': best_length,
+                })
+            if progress >= 1.0 or (cancel is not None and cancel.is_set()):
+                break
+            if lower_bound is not None and calculate_gap(best_length, lower_bound) <= tolerance:
+                break
+            if geometric:
+                temperature = t_start * (t_end / t_start) ** progress
+            else:
+                temperature = t_start + (t_end - t_start) * progress
+        if pending:
+            self.best = (tour.to_list(), best_length)
+        if stats is not None:
+            stats.add('iterations', done)
+        # Длина накапливалась приращениями - пересчитываем точно:
+        self.length = calculate_route_length(self.coords, tour.to_list())
+        route = self.best[0]
+        self.best = (route, calculate_route_length(self.coords, route))
+        return self.best
+
+
+def main(data, time_limit=1.0, stats=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
+
+    with measure_phase(stats, 'construction'):
+        solver = AnnealingSolver(points)
+    with measure_phase(stats, 'search'):
+        solver.run(time_limit=time_limit, stats=stats)
+
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(create_distance_matrix(points))
+
+    result = solver.get_result()
+    print(format_result_string(result))
+    print(format_gap_string(result[-1], bound))
+    return result, stats
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
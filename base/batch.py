@@ -0,0 +1,280 @@
+"""Пакетное решение множества небольших задач из потока JSONL.
+Каждая строка входа - задача: {"id": ..., "points": [[x, y], ...], "solver": "...", "time_limit": ...}
+(solver и time_limit необязательны). Задачи раздаются пулу процессов, причем одновременно
+в работе не больше max_in_flight задач, поэтому память не зависит от длины входа.
+Результаты выводятся строками JSONL в порядке входа или в порядке готовности:
+{"id": ..., "solver": ..., "route": [...], "length": ..., "time": ...} или {"id": ..., "error": "..."}.
+Модули решателей импортируются один раз при запуске процесса пула, а не для каждой задачи.
+Точные решатели не умеют останавливаться по time_limit, поэтому задачи для них больше
+HELD_KARP_LIMIT и BRANCH_AND_BOUND_LIMIT точек сразу получают запись об ошибке, а результат любой задачи
+ждется не дольше time_limit + TIMEOUT_MARGIN: после этого выдается запись об ошибке TimeoutError,
+и одна долгая задача не останавливает выдачу остальных."""
+
+
+from collections import deque
+import json
+from multiprocessing import Pool, TimeoutError
+import os
+import queue
+import sys
+import time
+
+import numpy as np
+
+from annealing import AnnealingSolver
+from construction import create_greedy_route
+from distance import create_distance_matrix, points_to_array
+from local_search import improve_route
+from postman_3 import find_optimal_route
+from postman_4 import solve_held_karp
+from tour import edges_to_route
+
+
+# До какого количества точек решатель auto выбирает точный метод Хелда-Карпа:
+EXACT_LIMIT = 12
+
+# Бюджет времени по умолчанию для решателей с ограничением по времени (секунд):
+DEFAULT_TIME_LIMIT = 1.0
+
+# Запас времени ожидания результата сверх time_limit (секунд):
+TIMEOUT_MARGIN = 2.0
+
+# Наибольшие размеры задач для точных решателей (held_karp и branch_and_bound):
+HELD_KARP_LIMIT = 20
+BRANCH_AND_BOUND_LIMIT = 40
+
+
+def check_size(coords, limit, name):
+    """
+    Вызывает ValueError, если в задаче больше limit точек
+    :type coords: numpy.ndarray
+    :type limit: int
+    :param name: название решателя для сообщения
+    """
+    if len(coords) > limit:
+        raise ValueError(f'Решатель {name} принимает не больше {limit} точек, получено {len(coords)}')
+
+
+def solve_exact(coords, time_limit):
+    """Точное решение методом Хелда-Карпа (postman_4)"""
+    check_size(coords, HELD_KARP_LIMIT, 'held_karp')
+    return solve_held_karp(create_distance_matrix(coords))
+
+
+def solve_branch_and_bound(coords, time_limit):
+    """Точное решение методом ветвей и границ (postman_3)"""
+    check_size(coords, BRANCH_AND_BOUND_LIMIT, 'branch_and_bound')
+    if len(coords) < 2:
+        return list(range(len(coords))), 0.0
+    matrix = create_distance_matrix(coords, diagonal=np.inf)
+    route = edges_to_route(find_optimal_route(matrix))
+    return route, float(matrix[route, np.roll(route, -1)].sum())
+
+
+def solve_greedy(coords, time_limit):
+    """Жадное построение по дугам (construction)"""
+    return create_greedy_route(coords)
+
+
+def solve_local_search(coords, time_limit):
+    """Жадное построение и локальный поиск 2-opt/Or-opt (local_search)"""
+    result = improve_route(coords, create_greedy_route(coords)[0])
+    return result[0], result[-1]
+
+
+def solve_annealing(coords, time_limit):
+    """Имитация отжига с бюджетом времени (annealing)"""
+    return AnnealingSolver(coords, seed=0).run(time_limit=time_limit)
+
+
+def solve_auto(coords, time_limit):
+    """Точное решение для небольших задач, иначе имитация отжига"""
+    if len(coords) <= EXACT_LIMIT:
+        return solve_exact(coords, time_limit)
+    return solve_annealing(coords, time_limit)
+
+
+# Решатели по названию: функция (координаты, бюджет времени) -> (маршрут, длина)
+SOLVERS = {
+    'auto': solve_auto,
+    'held_karp': solve_exact,
+    'branch_and_bound': solve_branch_and_bound,
+    'greedy': solve_greedy,
+    'local_search': solve_local_search,
+    'annealing': solve_annealing,
+}
+
+
+class InvalidTask:
+    """Строка входа, не являющаяся задачей: результат - готовая запись об ошибке, решать нечего"""
+
+    def __init__(self, result):
+        """
+        :param result: запись результата {"id": ..., "error": "..."}
+        """
+        self.result = result
+
+
+def solve_task(task):
+    """
+    Решает одну задачу. Выполняется в процессе пула. Ошибки задачи возвращаются в результате,
+    а не прерывают пакет.
+    :param task: словарь задачи
+    :rtype: dict
+    """
+    name = task.get('solver', 'auto')
+    result = {'id': task.get('id'), 'solver': name}
+    started = time.perf_counter()
+    try:
+        if name not in SOLVERS:
+            raise ValueError(f'Неизвестный решатель {name!r}, допустимо: {", ".join(SOLVERS)}')
+        coords = points_to_array(task['points'])
+        route, length = SOLVERS[name](coords, float(task.get('time_limit', DEFAULT_TIME_LIMIT)))
+        result['route'] = [int(x) for x in route]
+        result['length'] = float(length)
+    except Exception as error:
+        result['error'] = f'{type(error).__name__}: {error}'
+    result['time'] = time.perf_counter() - started
+    return result
+
+
+def read_tasks(lines, defaults=None):
+    """
+    Разбирает строки JSONL в задачи. Задаче без id присваивается номер строки,
+    отсутствующие поля берутся из defaults. Пустые строки пропускаются. Строки, которые
+    не разбираются как JSON или содержат не объект, выдаются как InvalidTask.
+    :type lines: iterable
+    :type defaults: dict
+    :rtype: generator
+    """
+    for number, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            task = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield InvalidTask({'id': number, 'error': f'JSONDecodeError: {error}'})
+            continue
+        if not isinstance(task, dict):
+            error = f'TypeError: задача должна быть объектом JSON, а не {type(task).__name__}'
+            yield InvalidTask({'id': number, 'error': error})
+            continue
+        task = {**(defaults or {}), **task}
+        task.setdefault('id', number)
+        yield task
+
+
+def get_timeout(task):
+    """
+    Возвращает, сколько секунд ждать результата задачи
+    :param task: словарь задачи
+    :rtype: float
+    """
+    try:
+        return float(task.get('time_limit', DEFAULT_TIME_LIMIT)) + TIMEOUT_MARGIN
+    except (TypeError, ValueError):
+        return DEFAULT_TIME_LIMIT + TIMEOUT_MARGIN
+
+
+def create_error_result(task, error):
+    """
+    Возвращает запись об ошибке задачи, которая не вернула результат
+    :param task: словарь задачи
+    :param error: текст ошибки
+    :rtype: dict
+    """
+    return {'id': task.get('id'), 'solver': task.get('solver', 'auto'), 'error': error}
+
+
+def solve_stream(tasks, processes=None, ordered=True, max_in_flight=None):
+    """
+    Решает поток задач на пуле процессов и выдает результаты по мере готовности.
+    Результата задачи, не готового через time_limit + TIMEOUT_MARGIN секунд ожидания, не ждут:
+    вместо него выдается запись об ошибке TimeoutError.
+    :param tasks: итератор задач (словарей или InvalidTask)
+    :param processes: количество процессов (по умолчанию - количество ядер)
+    :param ordered: выдавать результаты в порядке входа (иначе - в порядке готовности)
+    :param max_in_flight: наибольшее количество задач в работе (по умолчанию - 4 на процесс)
+    :rtype: generator
+    """
+    processes = processes or os.cpu_count()
+    max_in_flight = max_in_flight or 4 * processes
+    # Задачи в работе по номеру в порядке входа. В порядке входа у каждой задачи есть
+    # AsyncResult (или InvalidTask), в порядке готовности результаты приходят через очередь done
+    # парами (номер задачи, результат).
+    pending = {}
+    done = queue.Queue()
+    with Pool(processes) as pool:
+        for key, task in enumerate(tasks):
+            if isinstance(task, InvalidTask):
+                pending[key] = (task.result, task)
+                if not ordered:
+                    done.put((key, task.result))
+            elif ordered:
+                pending[key] = (task, pool.apply_async(solve_task, (task,)))
+            else:
+                pending[key] = (task, None)
+                pool.apply_async(solve_task, (task,), callback=lambda result, key=key: done.put((key, result)),
+                                 error_callback=lambda error, key=key, task=task: done.put(
+                                     (key, create_error_result(task, f'{type(error).__name__}: {error}'))))
+            if len(pending) >= max_in_flight:
+                yield take_result(pending, done, ordered)
+        while pending:
+            yield take_result(pending, done, ordered)
+
+
+def take_result(pending, done, ordered=True):
+    """
+    Дожидается и возвращает следующий результат: в порядке входа - результат самой старой задачи,
+    в порядке готовности - первый готовый. Если результата нет дольше времени ожидания самой
+    старой задачи, она снимается с ожидания с записью об ошибке TimeoutError.
+    :type pending: dict
+    :type done: queue.Queue
+    :type ordered: bool
+    :rtype: dict
+    """
+    key = next(iter(pending))
+    task, item = pending[key]
+    if isinstance(item, InvalidTask) and ordered:
+        del pending[key]
+        return item.result
+    timeout = get_timeout(task)
+    message = f'TimeoutError: результат не получен за {timeout} с'
+    if ordered:
+        del pending[key]
+        try:
+            return item.get(timeout)
+        except TimeoutError:
+            return create_error_result(task, message)
+        except Exception as error:
+            return create_error_result(task, f'{type(error).__name__}: {error}')
+    while True:
+        try:
+            ready, result = done.get(timeout=timeout)
+        except queue.Empty:
+            del pending[key]
+            return create_error_result(task, message)
+        # Результаты задач, уже снятых с ожидания, отбрасываются:
+        if ready in pending:
+            del pending[ready]
+            return result
+
+
+def main(path='-', output=None, processes=None, ordered=True):
+    # Поток задач из файла или стандартного ввода:
+    output = output or sys.stdout
+    file = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        for result in solve_stream(read_tasks(file), processes=processes, ordered=ordered):
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    # python batch.py tasks.jsonl > results.jsonl  (или python batch.py < tasks.jsonl)
+    main(sys.argv[1] if len(sys.argv) > 1 else '-')
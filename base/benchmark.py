@@ -0,0 +1,263 @@
+"""Воспроизводимое сравнение решателей на наборах точек растущего размера.
+Наборы генерируются по seed: равномерно случайные точки и точки, собранные в кластеры.
+Каждый решатель запускается в отдельном процессе с ограничением по времени; замеряются время,
+пиковый размер процесса (и, по желанию, пиковая память выделений Python через tracemalloc)
+и качество - отношение длины маршрута к лучшей найденной длине на том же наборе.
+Если решатель не уложился во время на каком-то размере, большие размеры для него пропускаются.
+Результат - отчет JSON и таблица масштабирования (время по размерам), по которым видно
+регрессии и размеры, на которых один метод обгоняет другой."""
+
+
+import json
+from multiprocessing import Process, Queue
+import queue
+import time
+import tracemalloc
+
+import numpy as np
+
+from annealing import AnnealingSolver
+from construction import create_greedy_route
+from decomposition import create_cluster_route
+from distance import calculate_route_length, create_distance_matrix
+from local_search import improve_route
+import postman_1
+import postman_2
+from postman_3 import find_optimal_route as find_little_route
+from postman_4 import solve_held_karp
+from postman_5 import find_optimal_route as find_dfs_route
+from stats import get_peak_rss
+from tour import edges_to_route
+
+
+# Размеры наборов по умолчанию:
+SIZES = (5, 8, 10, 12, 15, 20, 50, 200, 1000, 5000)
+
+# Ограничение времени одного запуска по умолчанию (секунд):
+TIMEOUT = 10.0
+
+# Бюджет времени имитации отжига (секунд):
+ANNEALING_TIME = 1.0
+
+
+def generate_instance(n, kind='random', seed=0, size=1000.0):
+    """
+    Генерирует набор точек в квадрате size x size
+    :param n: количество точек
+    :param kind: 'random' - равномерно случайные точки, 'clustered' - точки вокруг sqrt(n) центров
+    :param seed: начальное значение генератора случайных чисел
+    :param size: сторона квадрата
+    :rtype: numpy.ndarray
+    """
+    rng = np.random.default_rng([seed, n])
+    if kind == 'random':
+        return rng.random((n, 2)) * size
+    if kind == 'clustered':
+        centres = rng.random((max(1, int(np.sqrt(n))), 2)) * size
+        owner = rng.integers(0, len(centres), n)
+        return np.clip(centres[owner] + rng.normal(scale=size / 50, size=(n, 2)), 0, size)
+    raise ValueError(f'Неизвестный вид набора {kind!r}, допустимо: random, clustered')
+
+
+def run_postman_1(coords):
+    """Полный перебор (postman_1)"""
+    row = postman_1.find_min_combination(create_distance_matrix(coords).tolist(), len(coords))
+    return row[0], row[-1]
+
+
+def run_postman_2(coords):
+    """Перебор с инкрементным пересчетом длины (postman_2)"""
+    row = postman_2.find_min_combination_incremental(create_distance_matrix(coords).tolist(), len(coords))
+    return row[0], row[-1]
+
+
+def run_postman_3(coords):
+    """Метод ветвей и границ Литтла (postman_3)"""
+    matrix = create_distance_matrix(coords, diagonal=np.inf)
+    route = edges_to_route(find_little_route(matrix))
+    return route, float(matrix[route, np.roll(route, -1)].sum())
+
+
+def run_postman_4(coords):
+    """Динамическое программирование Хелда-Карпа (postman_4)"""
+    return solve_held_karp(create_distance_matrix(coords))
+
+
+def run_postman_5(coords):
+    """Поиск в глубину с оценкой через остовное дерево (postman_5)"""
+    return find_dfs_route(create_distance_matrix(coords))
+
+
+def run_greedy(coords):
+    """Жадное построение по дугам (construction)"""
+    return create_greedy_route(coords)
+
+
+def run_local_search(coords):
+    """Жадное построение и локальный поиск (local_search)"""
+    result = improve_route(coords, create_greedy_route(coords)[0])
+    return result[0], result[-1]
+
+
+def run_annealing(coords):
+    """Имитация отжига (annealing)"""
+    return AnnealingSolver(coords, seed=0).run(time_limit=ANNEALING_TIME)
+
+
+def run_decomposition(coords):
+    """Разбиение на кластеры (decomposition)"""
+    return create_cluster_route(coords, processes=1)
+
+
+# Решатели: название -> (функция координаты -> (маршрут, длина), наибольший размер набора)
+STRATEGIES = {
+    'postman_1': (run_postman_1, 10),
+    'postman_2': (run_postman_2, 12),
+    'postman_3': (run_postman_3, 60),
+    'postman_4': (run_postman_4, 18),
+    'postman_5': (run_postman_5, 30),
+    'greedy': (run_greedy, None),
+    'local_search': (run_local_search, None),
+    'annealing': (run_annealing, None),
+    'decomposition': (run_decomposition, None),
+}
+
+
+def measure_run(results, name, coords, trace_memory):
+    """
+    Выполняет решатель и передает замеры через очередь. Выполняется в отдельном процессе.
+    :type results: multiprocessing.Queue
+    :type name: str
+    :type coords: numpy.ndarray
+    :type trace_memory: bool
+    :return: None
+    """
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        route, _ = STRATEGIES[name][0](coords)
+        elapsed = time.perf_counter() - started
+        route = np.asarray(route, dtype=np.int64)
+        if len(route) != len(coords) or len(np.unique(route)) != len(coords):
+            raise ValueError('Маршрут проходит не через все точки')
+        result = {
+            'status': 'ok',
+            'time': elapsed,
+            'length': calculate_route_length(coords, route),
+        }
+    except Exception as error:
+        result = {'status': 'error', 'error': f'{type(error).__name__}: {error}'}
+    result['peak_rss'] = get_peak_rss()
+    result['peak_memory'] = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    results.put(result)
+
+
+def run_strategy(name, coords, timeout=TIMEOUT, trace_memory=False):
+    """
+    Запускает решатель в отдельном процессе и возвращает замеры. Процесс, не уложившийся
+    во время timeout, завершается.
+    :type name: str
+    :type coords: numpy.ndarray
+    :type timeout: float
+    :type trace_memory: bool
+    :rtype: dict
+    """
+    results = Queue()
+    process = Process(target=measure_run, args=(results, name, coords, trace_memory))
+    process.start()
+    try:
+        result = results.get(timeout=timeout)
+    except queue.Empty:
+        process.terminate()
+        result = {'status': 'timeout', 'time': timeout}
+    process.join()
+    return result
+
+
+def run_benchmark(sizes=SIZES, kinds=('random', 'clustered'), seeds=(0,), strategies=None,
+                  timeout=TIMEOUT, trace_memory=False):
+    """
+    Запускает решатели на всех наборах и возвращает отчет
+    :param sizes: размеры наборов
+    :param kinds: виды наборов (см. generate_instance)
+    :param seeds: значения seed - по одному набору каждого вида и размера на seed
+    :param strategies: названия решателей (по умолчанию - все из STRATEGIES)
+    :param timeout: ограничение времени одного запуска в секундах
+    :param trace_memory: замерять пиковую память выделений Python (замедляет решатели)
+    :rtype: dict
+    """
+    strategies = list(strategies or STRATEGIES)
+    entries = []
+    for kind in kinds:
+        timed_out = set()
+        for n in sorted(sizes):
+            for seed in seeds:
+                coords = generate_instance(n, kind, seed)
+                instance = []
+                for name in strategies:
+                    limit = STRATEGIES[name][1]
+                    if name in timed_out or (limit is not None and n > limit):
+                        continue
+                    result = run_strategy(name, coords, timeout, trace_memory)
+                    if result['status'] == 'timeout':
+                        timed_out.add(name)
+                    instance.append({'strategy': name, 'kind': kind, 'n': n, 'seed': seed, **result})
+                # Качество - отношение к лучшей длине на этом наборе:
+                lengths = [x['length'] for x in instance if x['status'] == 'ok']
+                for x in instance:
+                    if x['status'] == 'ok':
+                        x['quality'] = x['length'] / min(lengths) if min(lengths) > 0 else 1.0
+                entries.extend(instance)
+    return {
+        'config': {'sizes': list(sizes), 'kinds': list(kinds), 'seeds': list(seeds),
+                   'strategies': strategies, 'timeout': timeout},
+        'results': entries,
+    }
+
+
+def format_scaling_table(report, kind='random'):
+    """
+    Возвращает таблицу масштабирования: строки - решатели, столбцы - размеры наборов,
+    в ячейках - медиана времени в секундах и (в скобках) худшее качество по seed
+    :type report: dict
+    :type kind: str
+    :rtype: str
+    """
+    sizes = sorted(report['config']['sizes'])
+    strategies = report['config']['strategies']
+    cells = {}
+    for x in report['results']:
+        if x['kind'] == kind:
+            cells.setdefault((x['strategy'], x['n']), []).append(x)
+    header = [kind] + [str(n) for n in sizes]
+    rows = [header]
+    for name in strategies:
+        row = [name]
+        for n in sizes:
+            runs = cells.get((name, n))
+            if not runs:
+                row.append('-')
+            elif any(x['status'] != 'ok' for x in runs):
+                row.append(runs[0]['status'] if all(x['status'] == runs[0]['status'] for x in runs) else 'mixed')
+            else:
+                median = float(np.median([x['time'] for x in runs]))
+                row.append(f"{median:.3f} ({max(x['quality'] for x in runs):.3f})")
+        rows.append(row)
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def main(sizes=SIZES, seeds=(0,), timeout=TIMEOUT, output='benchmark.json'):
+    report = run_benchmark(sizes=sizes, seeds=seeds, timeout=timeout)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    for kind in report['config']['kinds']:
+        print(format_scaling_table(report, kind))
+        print()
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    main()
+    # main(sizes=(5, 8, 10), timeout=2.0)
@@ -0,0 +1,248 @@
+"""Нижняя оценка длины оптимального маршрута по Хелду-Карпу (1-дерево с подградиентной оптимизацией).
+1-дерево - минимальное остовное дерево на точках 1..n-1 плюс две самые короткие дуги из точки 0.
+Любой маршрут - это 1-дерево, поэтому вес минимального 1-дерева не больше длины оптимального маршрута.
+Оценку усиливают штрафы точек pi: длина дуги (i, j) заменяется на d(i, j) + pi[i] + pi[j],
+что не меняет сравнение маршрутов (у каждого маршрута добавляется 2 * sum(pi)), но меняет 1-дерево.
+Штрафы подбираются подградиентным методом: точкам со степенью больше 2 штраф увеличивается,
+точкам-листьям уменьшается. Все операции векторизованы по строкам матрицы расстояний.
+Верхняя оценка по умолчанию - маршрут ближайшего соседа (find_nearest_neighbour_route).
+Для метода ветвей и границ есть 1-дерево, обязанное содержать уже включенные дуги
+(calculate_fixed_one_tree): ребра со штрафами сортируются один раз, а в каждом узле
+1-дерево строится алгоритмом Краскала, начиная с включенных дуг.
+Зная оценку, можно указать для любого маршрута, насколько он в худшем случае хуже оптимального,
+и прекращать долгий поиск, как только это отклонение меньше допустимого."""
+
+
+
+import numpy as np
+
+from distance import create_distance_matrix
+
+
+def find_nearest_neighbour_route(matrix):
+    """
+    Строит маршрут эвристикой ближайшего соседа, начиная с точки 0.
+    Возвращает список дуг обхода и длину маршрута - начальный рекорд для метода ветвей и границ.
+    :type matrix: numpy.ndarray
+    :rtype: (list, float)
+    """
+    n = len(matrix)
+    visited = [False] * n
+    visited[0] = True
+    current = 0
+    edges = []
+    length = 0
+    for _ in range(n - 1):
+        nearest = min((j for j in range(n) if not visited[j]), key=lambda j: matrix[current][j])
+        edges.append((current, nearest))
+        length += matrix[current][nearest]
+        visited[nearest] = True
+        current = nearest
+    edges.append((current, 0))
+    length += matrix[current][0]
+    return edges, length
+
+
+def calculate_one_tree(matrix, pi):
+    """
+    Строит минимальное 1-дерево для матрицы со штрафами pi.
+    Возвращает вес 1-дерева за вычетом 2 * sum(pi) (нижнюю оценку) и степени точек в 1-дереве.
+    :param matrix: матрица расстояний n x n
+    :param pi: массив штрафов точек
+    :rtype: (float, numpy.ndarray)
+    """
+    n = len(matrix)
+    weights = matrix + pi[:, np.newaxis] + pi[np.newaxis, :]
+    np.fill_diagonal(weights, np.inf)
+    # Минимальное остовное дерево на точках 1..n-1 (алгоритм Прима):
+    sub = weights[1:, 1:]
+    m = n - 1
+    in_tree = np.zeros(m, dtype=bool)
+    in_tree[0] = True
+    key = sub[0].copy()
+    key[0] = np.inf
+    parent = np.zeros(m, dtype=np.int64)
+    total = 0.0
+    for _ in range(m - 1):
+        j = int(np.argmin(key))
+        total += key[j]
+        in_tree[j] = True
+        key[j] = np.inf
+        closer = (sub[j] < key) & ~in_tree
+        key[closer] = sub[j][closer]
+        parent[closer] = j
+    degrees = np.zeros(n, dtype=np.int64)
+    children = np.arange(1, m)
+    np.add.at(degrees, children + 1, 1)
+    np.add.at(degrees, parent[1:] + 1, 1)
+    # Две самые короткие дуги из точки 0:
+    nearest = np.argpartition(weights[0, 1:], 1)[:2] + 1
+    total += weights[0, nearest].sum()
+    degrees[0] = 2
+    degrees[nearest] += 1
+    return total - 2 * pi.sum(), degrees
+
+
+def sort_tree_edges(weights):
+    """
+    Возвращает ребра (вес, i, j), i < j, матрицы длин со штрафами, отсортированные по весу,
+    для calculate_fixed_one_tree
+    :param weights: симметричная матрица n x n
+    :rtype: list
+    """
+    first, second = np.triu_indices(len(weights), 1)
+    lengths = np.asarray(weights)[first, second]
+    order = np.argsort(lengths, kind='stable')
+    return list(zip(lengths[order].tolist(), first[order].tolist(), second[order].tolist()))
+
+
+def calculate_fixed_one_tree(weights, edges, fixed, allowed=None):
+    """
+    Возвращает вес минимального 1-дерева, содержащего заданные дуги (как неориентированные ребра),
+    или np.inf, если 1-дерево из допустимых ребер построить нельзя.
+    Дуги не должны образовывать цикл, а в точке 0 их должно быть не больше двух.
+    :param weights: матрица длин со штрафами в виде списка строк
+    :param edges: ребра из sort_tree_edges для той же матрицы
+    :param fixed: последовательность включенных дуг (i, j)
+    :param allowed: матрица допустимости ребер в виде списка строк (по умолчанию допустимы все)
+    :rtype: float
+    """
+    n = len(weights)
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    total = 0.0
+    # Ребер остовного дерева на точках 1..n-1 и ребер из точки 0:
+    count = at_zero = 0
+    fixed_zero = set()
+    for a, b in fixed:
+        total += weights[a][b]
+        if a == 0 or b == 0:
+            at_zero += 1
+            fixed_zero.add(a + b)
+        else:
+            parent[find(a)] = find(b)
+            count += 1
+    for weight, a, b in edges:
+        if count == n - 2 and at_zero == 2:
+            return total
+        if allowed is not None and not allowed[a][b]:
+            continue
+        if a == 0:
+            if at_zero < 2 and b not in fixed_zero:
+                total += weight
+                at_zero += 1
+        elif count < n - 2:
+            a, b = find(a), find(b)
+            if a != b:
+                parent[a] = b
+                total += weight
+                count += 1
+    return total if count == n - 2 and at_zero == 2 else np.inf
+
+
+def find_penalties(matrix, upper_bound=None, iterations=100, patience=10, step=2.0):
+    """
+    Подбирает штрафы точек подградиентным методом. Возвращает нижнюю оценку по Хелду-Карпу
+    и штрафы, на которых она достигнута (их можно использовать в оценках метода ветвей и границ).
+    Шаг подградиентного метода: step * (upper_bound - оценка) / ||степени - 2||^2;
+    множитель step уменьшается вдвое, если оценка не растет patience итераций подряд.
+    :param matrix: матрица расстояний n x n
+    :param upper_bound: длина известного маршрута (по умолчанию - маршрут ближайшего соседа)
+    :param iterations: наибольшее количество итераций
+    :param patience: через сколько итераций без улучшения уменьшается шаг
+    :param step: начальный множитель шага
+    :rtype: (float, numpy.ndarray)
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(matrix)
+    if n < 3:
+        return (float(matrix[0, 1] + matrix[1, 0]) if n == 2 else 0.0), np.zeros(n)
+    if upper_bound is None:
+        upper_bound = find_nearest_neighbour_route(matrix)[1]
+    pi = np.zeros(n)
+    best = -np.inf
+    best_pi = pi
+    fails = 0
+    for _ in range(iterations):
+        bound, degrees = calculate_one_tree(matrix, pi)
+        if bound > best + 1e-12:
+            best, best_pi = bound, pi.copy()
+            fails = 0
+        else:
+            fails += 1
+            if fails >= patience:
+                step /= 2
+                fails = 0
+        gradient = degrees - 2
+        norm = float((gradient ** 2).sum())
+        # Все степени равны 2 - 1-дерево является маршрутом, оценка точная:
+        if norm == 0 or best >= upper_bound - 1e-9:
+            break
+        pi += step * (upper_bound - bound) / norm * gradient
+    return float(min(best, upper_bound)), best_pi
+
+
+def calculate_lower_bound(matrix, upper_bound=None, iterations=100, patience=10, step=2.0):
+    """
+    Вычисляет нижнюю оценку длины оптимального маршрута по Хелду-Карпу (см. find_penalties).
+    :param matrix: матрица расстояний n x n
+    :param upper_bound: длина известного маршрута (по умолчанию - маршрут ближайшего соседа)
+    :param iterations: наибольшее количество итераций
+    :param patience: через сколько итераций без улучшения уменьшается шаг
+    :param step: начальный множитель шага
+    :rtype: float
+    """
+    return find_penalties(matrix, upper_bound, iterations, patience, step)[0]
+
+
+def calculate_gap(length, bound):
+    """
+    Возвращает относительное отклонение длины маршрута от нижней оценки -
+    наибольшую возможную долю, на которую маршрут хуже оптимального
+    :type length: float
+    :type bound: float
+    :rtype: float
+    """
+    if bound <= 0:
+        return 0.0 if length <= 0 else np.inf
+    return max(0.0, (length - bound) / bound)
+
+
+def format_gap_string(length, bound):
+    """
+    Возвращает строку с нижней оценкой и отклонением маршрута от оптимума
+    :type length: float
+    :type bound: float
+    :rtype: str
+    """
+    return f'Нижняя оценка {bound}, отклонение от оптимума не более {calculate_gap(length, bound):.2%}'
+
+
+def main(data):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    matrix = create_distance_matrix(points)
+
+    edges, length = find_nearest_neighbour_route(matrix)
+    bound = calculate_lower_bound(matrix, upper_bound=length)
+
+    print(format_gap_string(length, bound))
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
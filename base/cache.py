@@ -0,0 +1,201 @@
+"""Постоянный кеш решенных маршрутов.
+Один и тот же набор остановок (в том числе в другом порядке) решается за день много раз.
+Ключ кеша не зависит от порядка точек: координаты сортируются, и ключ - хеш отсортированных
+координат вместе с названием метрики. Маршрут хранится номерами точек в отсортированном
+порядке, поэтому найденный маршрут переводится в нумерацию вызывающего кода.
+Записи лежат в каталоге по одному файлу на набор точек. Порядок использования отслеживается
+временем изменения файла: оно обновляется при каждом попадании, в том числе из памяти,
+а при превышении размера каталога удаляются давно не использованные записи (LRU).
+Последние записи дополнительно хранятся в памяти процесса, поэтому повторный запрос
+не читает файл с диска."""
+
+
+from collections import OrderedDict
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from distance import create_distance_matrix, points_to_array
+from postman_2 import create_result_row, format_result_string
+from postman_4 import solve_held_karp
+
+
+# Наибольший размер каталога кеша по умолчанию (байт):
+MAX_CACHE_BYTES = 256 << 20
+
+# Количество записей, хранимых в памяти процесса:
+MEMORY_ENTRIES = 1024
+
+
+def canonicalize_points(coords, metric='euclidean'):
+    """
+    Возвращает ключ набора точек, не зависящий от их порядка, и порядок сортировки точек
+    (order[k] - номер k-й по порядку точки в исходной нумерации)
+    :param coords: массив координат n x 2
+    :param metric: название метрики
+    :rtype: (str, numpy.ndarray)
+    """
+    # -0.0 и 0.0 должны давать один ключ:
+    coords = coords + 0.0
+    order = np.lexsort((coords[:, 1], coords[:, 0]))
+    digest = hashlib.sha1(metric.encode())
+    digest.update(np.ascontiguousarray(coords[order]).tobytes())
+    return digest.hexdigest(), order
+
+
+class RouteCache:
+    """Кеш маршрутов в каталоге на диске с вытеснением давно не использованных записей"""
+
+    def __init__(self, directory, max_bytes=MAX_CACHE_BYTES, memory_entries=MEMORY_ENTRIES):
+        """
+        :param directory: каталог кеша (создается при необходимости)
+        :param max_bytes: наибольший суммарный размер записей на диске
+        :param memory_entries: количество записей, хранимых в памяти процесса
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def load(self, key):
+        """
+        Возвращает запись (маршрут в отсортированной нумерации, длина) или None
+        :type key: str
+        :rtype: (numpy.ndarray, float) or None
+        """
+        path = self.get_path(key)
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            # Время изменения файла обновляется и здесь, иначе самые частые записи
+            # выглядели бы на диске самыми старыми и вытеснялись первыми:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return entry
+        try:
+            with np.load(path) as data:
+                entry = (data['route'], float(data['length']))
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        self.remember(key, entry)
+        return entry
+
+    def remember(self, key, entry):
+        """Сохраняет запись в памяти процесса, вытесняя самую старую"""
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, points, metric='euclidean'):
+        """
+        Возвращает маршрут по точкам в их нумерации (начиная с точки 0) и его длину или None
+        :param points: словарь точек или массив координат n x 2
+        :param metric: название метрики
+        :rtype: (list, float) or None
+        """
+        key, order = canonicalize_points(points_to_array(points), metric)
+        entry = self.load(key)
+        if entry is None:
+            return None
+        route = order[entry[0]]
+        start = int(np.flatnonzero(route == 0)[0]) if len(route) else 0
+        return np.roll(route, -start).tolist(), entry[1]
+
+    def put(self, points, route, length, metric='euclidean'):
+        """
+        Сохраняет маршрут по точкам (в их нумерации) в кеш
+        :param points: словарь точек или массив координат n x 2
+        :param route: последовательность номеров точек
+        :param length: длина маршрута
+        :param metric: название метрики
+        :return: None
+        """
+        key, order = canonicalize_points(points_to_array(points), metric)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        entry = (rank[np.asarray(route, dtype=np.int64)].astype(np.int32), float(length))
+        path = self.get_path(key)
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as file:
+            np.savez(file, route=entry[0], length=entry[1])
+        os.replace(temp, path)
+        self.remember(key, entry)
+        self.evict()
+
+    def evict(self):
+        """
+        Удаляет давно не использованные записи, пока суммарный размер больше max_bytes
+        :return: None
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith('.npz'):
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def solve(self, points, solver, metric='euclidean'):
+        """
+        Возвращает маршрут из кеша, а при его отсутствии решает задачу функцией solver
+        и сохраняет результат
+        :param points: словарь точек или массив координат n x 2
+        :param solver: функция, принимающая массив координат и возвращающая (маршрут, длина)
+        :param metric: название метрики
+        :rtype: (list, float)
+        """
+        cached = self.get(points, metric)
+        if cached is not None:
+            return cached
+        route, length = solver(points_to_array(points))
+        self.put(points, route, length, metric)
+        # Маршрут возвращается в том же виде, что и из кеша - начиная с точки 0:
+        route = np.asarray(route, dtype=np.int64)
+        start = int(np.flatnonzero(route == 0)[0]) if len(route) else 0
+        return np.roll(route, -start).tolist(), length
+
+
+def main(data, directory=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    matrix = create_distance_matrix(points)
+
+    # Без явного каталога кеш создается во временном каталоге и удаляется после работы:
+    with tempfile.TemporaryDirectory() as temp:
+        cache = RouteCache(directory or temp)
+        route, length = cache.solve(points, lambda coords: solve_held_karp(create_distance_matrix(coords)))
+
+    print(format_result_string(create_result_row(matrix.tolist(), route)))
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
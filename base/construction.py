@@ -0,0 +1,244 @@
+"""Быстрое построение начальных маршрутов для локального поиска.
+Обход по кривой Гильберта: точки упорядочиваются по номеру на кривой Гильберта,
+заполняющей квадрат вокруг точек. Соседние по кривой точки близки на плоскости,
+поэтому маршрут получается приличным (обычно на 25-40% длиннее оптимального),
+а строится за O(n log n) - одна сортировка. Номера на кривой считаются векторно
+для всех точек сразу, длина маршрута суммируется порциями, так что миллион точек
+обрабатывается примерно за полсекунды и попарная матрица не нужна.
+Жадное построение по дугам: дуги-кандидаты (k ближайших соседей или, для небольших наборов,
+все пары) перебираются по возрастанию длины, дуга принимается, если у обоих концов
+меньше двух дуг и она не замыкает цикл раньше времени (проверка системой непересекающихся
+множеств). Такой маршрут обычно на 15-20% длиннее оптимального против 25% у ближайшего соседа."""
+
+
+
+import numpy as np
+
+from bound import calculate_lower_bound, format_gap_string
+from distance import (calculate_route_length, calculate_route_lengths, create_condensed_matrix,
+                      create_distance_matrix, points_to_array)
+from postman_2 import format_result_string
+from spatial import GridIndex
+from stats import SearchStats, measure_phase
+
+
+# Количество уровней кривой Гильберта (сетка 2^HILBERT_ORDER x 2^HILBERT_ORDER):
+HILBERT_ORDER = 16
+
+# До какого количества точек в жадном построении рассматриваются все пары точек:
+FULL_GREEDY_LIMIT = 500
+
+# Количество ближайших соседей - кандидатов в жадном построении:
+GREEDY_NEIGHBOURS = 10
+
+
+def calculate_hilbert_keys(points, order=HILBERT_ORDER):
+    """
+    Возвращает номера точек на кривой Гильберта порядка order. Координаты масштабируются
+    в сетку 2^order x 2^order по наибольшему из размахов, чтобы сохранить пропорции.
+    :param points: словарь точек или массив координат n x 2
+    :type order: int
+    :rtype: numpy.ndarray
+    """
+    coords = points_to_array(points)
+    side = 1 << order
+    origin = coords.min(axis=0)
+    extent = float((coords.max(axis=0) - origin).max()) or 1.0
+    scaled = np.minimum((coords - origin) * ((side - 1) / extent), side - 1).astype(np.int32)
+    x = scaled[:, 0].copy()
+    y = scaled[:, 1].copy()
+    keys = np.zeros(len(coords), dtype=np.int64)
+    rx = np.empty_like(x)
+    ry = np.empty_like(x)
+    t = np.empty_like(x)
+    for bit in range(order - 1, -1, -1):
+        np.right_shift(x, bit, out=rx)
+        rx &= 1
+        np.right_shift(y, bit, out=ry)
+        ry &= 1
+        # Номер четверти на этом уровне: 3 * rx ^ ry
+        np.multiply(rx, 3, out=t)
+        t ^= ry
+        keys += t.astype(np.int64) << (2 * bit)
+        # Поворот четверти, чтобы следующий уровень кривой был ориентирован правильно:
+        # при ry == 0 и rx == 1 отражение (side - 1 - x == x ^ (side - 1)), при ry == 0 обмен x и y.
+        ry ^= 1
+        rx &= ry
+        np.negative(rx, out=t)
+        t &= side - 1
+        x ^= t
+        y ^= t
+        np.bitwise_xor(x, y, out=t)
+        np.negative(ry, out=ry)
+        t &= ry
+        x ^= t
+        y ^= t
+    return keys
+
+
+def create_hilbert_route(points, order=HILBERT_ORDER, stats=None):
+    """
+    Строит маршрут обходом точек по кривой Гильберта, начиная с точки 0.
+    Возвращает кортеж из массива номеров точек и длины маршрута.
+    :param points: словарь точек или массив координат n x 2
+    :type order: int
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :rtype: (numpy.ndarray, float)
+    """
+    coords = points_to_array(points)
+    route = np.argsort(calculate_hilbert_keys(coords, order), kind='stable')
+    if len(route):
+        route = np.roll(route, -int(np.flatnonzero(route == 0)[0]))
+    length = calculate_route_length(coords, route)
+    if stats is not None:
+        stats.record_bound(length)
+    return route, length
+
+
+class UnionFind:
+    """Система непересекающихся множеств со сжатием путей и объединением по размеру"""
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x):
+        """Возвращает представителя множества, содержащего x"""
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x, y):
+        """Объединяет множества x и y. Возвращает False, если они уже совпадают."""
+        x, y = self.find(x), self.find(y)
+        if x == y:
+            return False
+        if self.size[x] < self.size[y]:
+            x, y = y, x
+        self.parent[y] = x
+        self.size[x] += self.size[y]
+        return True
+
+
+def get_candidate_edges(coords, nodes, k):
+    """
+    Возвращает дуги-кандидаты между точками nodes, отсортированные по длине:
+    все пары при небольшом количестве точек, иначе k ближайших соседей каждой точки.
+    :type coords: numpy.ndarray
+    :param nodes: массив номеров точек
+    :type k: int
+    :return: массивы начал и концов дуг (номера точек)
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    m = len(nodes)
+    sub = coords[nodes]
+    if m <= FULL_GREEDY_LIMIT:
+        first, second = np.triu_indices(m, 1)
+        lengths = create_condensed_matrix(sub)
+    else:
+        neighbours = GridIndex(sub).knn(min(k, m - 1))
+        first = np.repeat(np.arange(m, dtype=np.int64), neighbours.shape[1])
+        second = neighbours.ravel().astype(np.int64)
+        # Каждую дугу оставляем один раз:
+        keys = np.unique(np.minimum(first, second) * m + np.maximum(first, second))
+        first, second = keys // m, keys % m
+        diff = sub[first] - sub[second]
+        lengths = np.hypot(diff[:, 0], diff[:, 1])
+    order = np.argsort(lengths, kind='stable')
+    return nodes[first[order]], nodes[second[order]]
+
+
+def create_greedy_route(points, k=GREEDY_NEIGHBOURS, stats=None):
+    """
+    Строит маршрут жадным выбором дуг. Если после перебора кандидатов маршрут распался
+    на несколько цепочек, концы цепочек соединяются тем же жадным правилом по кандидатам,
+    построенным только на концах цепочек, пока не останется одна цепочка.
+    Возвращает кортеж из массива номеров точек (начиная с точки 0) и длины маршрута.
+    :param points: словарь точек или массив координат n x 2
+    :param k: количество ближайших соседей - кандидатов
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :rtype: (numpy.ndarray, float)
+    """
+    coords = points_to_array(points)
+    n = len(coords)
+    if n < 3:
+        route = np.arange(n)
+        return route, calculate_route_length(coords, route)
+    rounds = examined = 0
+    degree = [0] * n
+    adjacent = [[] for _ in range(n)]
+    sets = UnionFind(n)
+    added = 0
+    nodes = np.arange(n)
+    while added < n - 1:
+        first, second = get_candidate_edges(coords, nodes, max(k, 2))
+        rounds += 1
+        examined += len(first)
+        for a, b in zip(first.tolist(), second.tolist()):
+            if degree[a] < 2 and degree[b] < 2 and sets.union(a, b):
+                degree[a] += 1
+                degree[b] += 1
+                adjacent[a].append(b)
+                adjacent[b].append(a)
+                added += 1
+                if added == n - 1:
+                    break
+        # Оставшиеся кандидаты - концы цепочек и одиночные точки:
+        nodes = np.flatnonzero(np.array(degree) < 2)
+    # Замыкаем единственную цепочку:
+    ends = [x for x in range(n) if degree[x] < 2]
+    adjacent[ends[0]].append(ends[-1])
+    adjacent[ends[-1]].append(ends[0])
+    # Обходим цикл, начиная с точки 0:
+    route = [0]
+    prev, current = 0, adjacent[0][0]
+    while current != 0:
+        route.append(current)
+        a, b = adjacent[current]
+        prev, current = current, (b if a == prev else a)
+    route = np.array(route)
+    length = calculate_route_length(coords, route)
+    if stats is not None:
+        # Количество построений списка кандидатов и всех построенных дуг-кандидатов:
+        stats.add('candidate_rounds', rounds)
+        stats.add('candidate_edges', examined)
+        stats.record_bound(length)
+    return route, length
+
+
+def main(data, method='greedy', stats=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
+
+    with measure_phase(stats, 'construction'):
+        if method == 'hilbert':
+            route, length = create_hilbert_route(points, stats=stats)
+        else:
+            route, length = create_greedy_route(points, stats=stats)
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(create_distance_matrix(points))
+    with measure_phase(stats, 'format'):
+        lengths = calculate_route_lengths(points, route).tolist()
+        result = [tuple(route.tolist())] + lengths + [length]
+
+    print(format_result_string(result))
+    print(format_gap_string(length, bound))
+    return result, stats
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
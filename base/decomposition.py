@@ -0,0 +1,183 @@
+"""Решение очень больших задач (100 000 точек и более) разбиением на кластеры.
+1. Точки разбиваются на кластеры по CLUSTER_POINTS точек методом k-средних: начальные центры -
+   средние отрезков кривой Гильберта, ближайший центр ищется по сеточному индексу (модуль spatial),
+   поэтому каждая итерация почти линейна.
+2. Маршрут внутри каждого кластера строится жадно и улучшается локальным поиском
+   независимо на пуле процессов - каждому процессу передаются только координаты его кластера.
+3. Порядок обхода кластеров - маршрут по их центрам.
+4. Маршруты кластеров размыкаются и сшиваются: вход в кластер - точка, ближайшая к выходу
+   из предыдущего, а направление обхода выбирается так, чтобы выход был ближе к следующему кластеру.
+5. Швы исправляются локальным поиском по всему маршруту, но очередь начинается только с точек
+   на границах кластеров (у которых среди ближайших соседей есть точки другого кластера).
+Память и время остаются почти линейными по количеству точек."""
+
+
+from multiprocessing import Pool
+import os
+
+import numpy as np
+
+from construction import calculate_hilbert_keys, create_greedy_route
+from distance import calculate_route_length, calculate_route_lengths, create_coordinate_distance, points_to_array
+from local_search import find_nearest_neighbours, optimize_route
+from postman_2 import format_result_string
+from spatial import GridIndex
+from stats import SearchStats, measure_phase
+
+
+# Среднее количество точек в одном кластере:
+CLUSTER_POINTS = 1000
+
+# Количество итераций метода k-средних:
+KMEANS_ITERATIONS = 5
+
+
+def cluster_points(coords, clusters, iterations=KMEANS_ITERATIONS):
+    """
+    Разбивает точки на кластеры методом k-средних. Возвращает номер кластера каждой точки;
+    пустые кластеры отбрасываются, номера идут подряд с нуля.
+    :param coords: массив координат n x 2
+    :param clusters: количество кластеров
+    :param iterations: количество итераций
+    :rtype: numpy.ndarray
+    """
+    n = len(coords)
+    clusters = max(1, min(clusters, n))
+    # Начальное разбиение - равные отрезки кривой Гильберта:
+    order = np.argsort(calculate_hilbert_keys(coords), kind='stable')
+    labels = np.empty(n, dtype=np.int64)
+    labels[order] = np.arange(n) * clusters // n
+    centres = np.zeros((clusters, 2))
+    for iteration in range(iterations + 1):
+        counts = np.bincount(labels, minlength=clusters)
+        filled = counts > 0
+        for axis in range(2):
+            sums = np.bincount(labels, weights=coords[:, axis], minlength=clusters)
+            centres[filled, axis] = sums[filled] / counts[filled]
+        if iteration == iterations:
+            break
+        labels = GridIndex(centres).query(coords, 1)[0][:, 0].astype(np.int64)
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def solve_cluster(coords):
+    """
+    Строит маршрут по точкам одного кластера: жадное построение и локальный поиск.
+    Выполняется в процессе пула. Возвращает номера точек кластера в порядке обхода.
+    :param coords: массив координат m x 2
+    :rtype: numpy.ndarray
+    """
+    if len(coords) < 4:
+        return np.arange(len(coords))
+    route = create_greedy_route(coords)[0]
+    neighbours = find_nearest_neighbours(coords, 10)
+    return np.array(optimize_route(route, create_coordinate_distance(coords), neighbours))
+
+
+def stitch_routes(coords, tours, centres):
+    """
+    Сшивает замкнутые маршруты кластеров в один маршрут в заданном порядке кластеров.
+    :param coords: массив координат n x 2
+    :param tours: маршруты кластеров (номера точек всего набора) в порядке обхода кластеров
+    :param centres: центры кластеров в том же порядке
+    :rtype: numpy.ndarray
+    """
+    count = len(tours)
+    parts = []
+    previous = centres[-1]
+    for index, tour in enumerate(tours):
+        points = coords[tour]
+        following = centres[(index + 1) % count]
+        entry = int(np.argmin(np.hypot(*(points - previous).T)))
+        path = np.roll(tour, -entry)
+        # Из двух направлений обхода выбираем то, в котором выход ближе к следующему кластеру:
+        backward = np.concatenate([path[:1], path[:0:-1]])
+        if np.hypot(*(coords[backward[-1]] - following)) < np.hypot(*(coords[path[-1]] - following)):
+            path = backward
+        parts.append(path)
+        previous = coords[path[-1]]
+    return np.concatenate(parts)
+
+
+def create_cluster_route(points, cluster_size=CLUSTER_POINTS, processes=None, k=10, stats=None):
+    """
+    Строит маршрут по очень большому набору точек разбиением на кластеры.
+    Возвращает кортеж из массива номеров точек (начиная с точки 0) и длины маршрута.
+    :param points: словарь точек или массив координат n x 2
+    :param cluster_size: среднее количество точек в кластере
+    :param processes: количество процессов (по умолчанию - количество ядер)
+    :param k: количество ближайших соседей в списках кандидатов при исправлении швов
+    :param stats: объект SearchStats для сбора статистики (модуль stats): этапы, количество
+        кластеров и граничных точек, длина маршрута до и после исправления швов
+    :rtype: (numpy.ndarray, float)
+    """
+    coords = points_to_array(points)
+    n = len(coords)
+    if n <= cluster_size:
+        with measure_phase(stats, 'clusters'):
+            route = solve_cluster(coords)
+        start = int(np.flatnonzero(route == 0)[0]) if n else 0
+        route = np.roll(route, -start)
+        length = calculate_route_length(coords, route)
+        if stats is not None:
+            stats.add('clusters')
+            stats.record_bound(length)
+        return route, length
+    with measure_phase(stats, 'clustering'):
+        labels = cluster_points(coords, -(-n // cluster_size))
+        clusters = int(labels.max()) + 1
+        members = np.split(np.argsort(labels, kind='stable'), np.cumsum(np.bincount(labels))[:-1])
+        centres = np.array([coords[x].mean(axis=0) for x in members])
+    with measure_phase(stats, 'clusters'):
+        # Порядок обхода кластеров - маршрут по центрам:
+        cluster_order = solve_cluster(centres) if clusters > 1 else np.zeros(1, dtype=np.int64)
+        processes = processes or os.cpu_count()
+        with Pool(processes) as pool:
+            local = pool.map(solve_cluster, [coords[x] for x in members],
+                             chunksize=max(1, clusters // (4 * processes)))
+    with measure_phase(stats, 'stitching'):
+        tours = [members[c][local[c]] for c in cluster_order]
+        route = stitch_routes(coords, tours, centres[cluster_order])
+    with measure_phase(stats, 'seams'):
+        # Исправление швов: очередь начинается с точек на границах кластеров:
+        neighbours = find_nearest_neighbours(coords, k)
+        boundary = np.flatnonzero((labels[neighbours] != labels[:, np.newaxis]).any(axis=1))
+        if stats is not None:
+            stats.add('clusters', clusters)
+            stats.add('boundary_points', len(boundary))
+            stats.record_bound(calculate_route_length(coords, route))
+        route = np.array(optimize_route(route, create_coordinate_distance(coords), neighbours, active=boundary,
+                                        stats=stats))
+    length = calculate_route_length(coords, route)
+    if stats is not None:
+        stats.record_bound(length)
+    return route, length
+
+
+def main(data, stats=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
+
+    route, length = create_cluster_route(points, stats=stats)
+    with measure_phase(stats, 'format'):
+        lengths = calculate_route_lengths(points, route).tolist()
+        result = [tuple(route.tolist())] + lengths + [length]
+
+    print(format_result_string(result))
+    return result, stats
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
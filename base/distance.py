@@ -0,0 +1,197 @@
+"""Общий для всех модулей расчет матрицы расстояний между точками.
+Вместо двойного цикла с вызовом calculate_distance для каждой пары все расстояния
+считаются векторно (broadcasting NumPy) блоками строк, чтобы временные массивы
+не превышали заданного объема даже для 5 000 - 20 000 точек.
+Кроме полной матрицы n x n поддерживается сжатое хранение верхнего треугольника
+(n * (n - 1) / 2 элементов, порядок как у scipy.spatial.distance.pdist)."""
+
+
+from math import hypot
+
+import numpy as np
+
+
+# Ограничение на размер временных массивов разностей координат в одном блоке (элементов):
+BLOCK_ELEMENTS = 1 << 22
+
+
+def calculate_distance(p1, p2):
+    """
+    Принимает координаты двух точек на плоскости и возвращает расстояние между ними
+    :type p1: (int, int)
+    :type p2: (int, int)
+    :rtype: float
+    """
+    return ((p2[0] - p1[0]) ** 2 + (p2[1] - p1[1]) ** 2) ** 0.5
+
+
+def points_to_array(points):
+    """
+    Принимает словарь точек {номер: (x, y)} (как его строит main) или последовательность координат
+    и возвращает массив координат размерностью n x 2
+    :type points: dict or list or numpy.ndarray
+    :rtype: numpy.ndarray
+    """
+    if isinstance(points, dict):
+        points = [points[i] for i in range(len(points))]
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def get_block_size(n):
+    """
+    Возвращает количество строк матрицы, обрабатываемых за один векторный шаг
+    :type n: int
+    :rtype: int
+    """
+    return max(1, BLOCK_ELEMENTS // max(1, 2 * n))
+
+
+def create_distance_matrix(points, dtype=np.float64, diagonal=0.0):
+    """
+    Принимает точки и возвращает полную симметричную матрицу расстояний n x n
+    :param points: словарь точек или массив координат n x 2
+    :param dtype: тип элементов матрицы (np.float32 или np.float64)
+    :param diagonal: значение на главной диагонали (np.inf для метода Литтла)
+    :rtype: numpy.ndarray
+    """
+    coords = points_to_array(points)
+    n = len(coords)
+    matrix = np.empty((n, n), dtype=dtype)
+    x = coords[:, 0].astype(dtype)
+    y = coords[:, 1].astype(dtype)
+    step = get_block_size(n)
+    for start in range(0, n, step):
+        stop = start + step
+        np.hypot(x[start:stop, np.newaxis] - x, y[start:stop, np.newaxis] - y, out=matrix[start:stop])
+    np.fill_diagonal(matrix, diagonal)
+    return matrix
+
+
+def create_condensed_matrix(points, dtype=np.float64):
+    """
+    Принимает точки и возвращает сжатую матрицу расстояний - одномерный массив верхнего
+    треугольника без диагонали длиной n * (n - 1) / 2. Расстояние между i и j
+    находится функцией get_condensed_distance.
+    :param points: словарь точек или массив координат n x 2
+    :param dtype: тип элементов (np.float32 или np.float64)
+    :rtype: numpy.ndarray
+    """
+    coords = points_to_array(points)
+    n = len(coords)
+    condensed = np.empty(n * (n - 1) // 2, dtype=dtype)
+    pos = 0
+    x = coords[:, 0].astype(dtype)
+    y = coords[:, 1].astype(dtype)
+    for i in range(n - 1):
+        np.hypot(x[i + 1:] - x[i], y[i + 1:] - y[i], out=condensed[pos:pos + n - 1 - i])
+        pos += n - 1 - i
+    return condensed
+
+
+def get_condensed_index(i, j, n):
+    """
+    Возвращает позицию пары точек (i, j), i != j, в сжатой матрице из n точек.
+    Работает и с массивами индексов.
+    :type i: int or numpy.ndarray
+    :type j: int or numpy.ndarray
+    :type n: int
+    :rtype: int or numpy.ndarray
+    """
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    return n * i - i * (i + 1) // 2 + j - i - 1
+
+
+def get_condensed_distance(condensed, i, j, n):
+    """
+    Возвращает расстояние между точками i и j по сжатой матрице (0 для i == j)
+    :type condensed: numpy.ndarray
+    :type i: int
+    :type j: int
+    :type n: int
+    :rtype: float
+    """
+    if i == j:
+        return 0.0
+    return condensed[get_condensed_index(i, j, n)]
+
+
+def expand_condensed_matrix(condensed, n, diagonal=0.0):
+    """
+    Разворачивает сжатую матрицу в полную симметричную матрицу n x n
+    :type condensed: numpy.ndarray
+    :type n: int
+    :param diagonal: значение на главной диагонали
+    :rtype: numpy.ndarray
+    """
+    matrix = np.empty((n, n), dtype=condensed.dtype)
+    upper = np.triu_indices(n, 1)
+    matrix[upper] = condensed
+    matrix.T[upper] = condensed
+    np.fill_diagonal(matrix, diagonal)
+    return matrix
+
+
+def calculate_route_lengths(points, route):
+    """
+    Возвращает массив длин дуг замкнутого маршрута: расстояние от route[i] до route[i + 1]
+    (последний элемент - возврат в начальную точку). Матрица расстояний не строится.
+    :param points: словарь точек или массив координат n x 2
+    :param route: последовательность номеров точек
+    :rtype: numpy.ndarray
+    """
+    coords = points_to_array(points)[np.asarray(route, dtype=np.intp)]
+    diff = np.roll(coords, -1, axis=0) - coords
+    return np.hypot(diff[:, 0], diff[:, 1])
+
+
+def create_coordinate_distance(points):
+    """
+    Возвращает функцию dist(i, j), считающую расстояние между точками по координатам.
+    Подходит для алгоритмов, которым нужны отдельные расстояния без полной матрицы.
+    :param points: словарь точек или массив координат n x 2
+    :rtype: function
+    """
+    coords = points_to_array(points)
+    xs = coords[:, 0].tolist()
+    ys = coords[:, 1].tolist()
+
+    def dist(i, j):
+        return hypot(xs[i] - xs[j], ys[i] - ys[j])
+
+    return dist
+
+
+def create_matrix_distance(matrix):
+    """
+    Возвращает функцию dist(i, j), берущую расстояние из готовой матрицы
+    :param matrix: матрица расстояний
+    :rtype: function
+    """
+    rows = matrix.tolist() if isinstance(matrix, np.ndarray) else matrix
+
+    def dist(i, j):
+        return rows[i][j]
+
+    return dist
+
+
+def calculate_route_length(points, route, chunk=1 << 20):
+    """
+    Возвращает длину замкнутого маршрута. Дуги суммируются порциями по chunk точек,
+    поэтому дополнительная память не зависит от размера маршрута (миллионы точек).
+    :param points: словарь точек или массив координат n x 2
+    :param route: последовательность номеров точек
+    :param chunk: количество дуг в одной порции
+    :rtype: float
+    """
+    coords = points_to_array(points)
+    route = np.asarray(route)
+    n = len(route)
+    if n < 2:
+        return 0.0
+    total = 0.0
+    for start in range(0, n - 1, chunk):
+        part = coords[route[start:min(start + chunk, n - 1) + 1]]
+        diff = part[1:] - part[:-1]
+        total += float(np.hypot(diff[:, 0], diff[:, 1]).sum())
+    return total + calculate_distance(coords[route[-1]], coords[route[0]])
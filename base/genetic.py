@@ -0,0 +1,192 @@
+"""Решение задачи "коммивояжера" генетическим алгоритмом над всей популяцией сразу.
+Популяция хранится массивом P x n (int32): каждая строка - маршрут.
+Длины всех маршрутов считаются одним обращением к матрице расстояний по индексам,
+а турнирный отбор, упорядоченное скрещивание (OX) и мутация разворотом участка
+выполняются векторно для всей популяции, без циклов Python по особям.
+Метод рассчитан на пропускную способность: за одно поколение обрабатываются
+P маршрутов целиком, а не по одной перестановке, как в postman_1/postman_2."""
+
+
+
+import numpy as np
+
+from bound import calculate_gap, calculate_lower_bound, format_gap_string
+from distance import create_distance_matrix
+from postman_2 import create_result_row, format_result_string
+from stats import SearchStats, measure_phase
+
+
+def create_population(size, n, rng):
+    """
+    Возвращает случайную популяцию - массив size x n случайных перестановок
+    :type size: int
+    :type n: int
+    :type rng: numpy.random.Generator
+    :rtype: numpy.ndarray
+    """
+    return np.argsort(rng.random((size, n)), axis=1).astype(np.int32)
+
+
+def calculate_fitness(matrix, population):
+    """
+    Возвращает длины всех маршрутов популяции
+    :type matrix: numpy.ndarray
+    :type population: numpy.ndarray
+    :rtype: numpy.ndarray
+    """
+    return matrix[population, np.roll(population, -1, axis=1)].sum(axis=1)
+
+
+def select_parents(lengths, count, rng, tournament=3):
+    """
+    Турнирный отбор: для каждого из count мест выбирается лучшая из tournament случайных особей.
+    Возвращает номера выбранных особей.
+    :type lengths: numpy.ndarray
+    :type count: int
+    :type rng: numpy.random.Generator
+    :type tournament: int
+    :rtype: numpy.ndarray
+    """
+    contestants = rng.integers(0, len(lengths), size=(count, tournament))
+    winners = np.argmin(lengths[contestants], axis=1)
+    return contestants[np.arange(count), winners]
+
+
+def crossover(first, second, rng):
+    """
+    Упорядоченное скрещивание (OX) для пар родителей. Потомок получает участок [i, j)
+    первого родителя на тех же местах, а остальные места, начиная с j, заполняются точками
+    второго родителя в порядке их следования после позиции j, кроме уже взятых.
+    :param first: массив B x n первых родителей
+    :param second: массив B x n вторых родителей
+    :type rng: numpy.random.Generator
+    :rtype: numpy.ndarray
+    """
+    count, n = first.shape
+    rows = np.arange(count)[:, np.newaxis]
+    positions = np.arange(n)
+    cuts = np.sort(rng.integers(0, n + 1, size=(count, 2)), axis=1)
+    i, j = cuts[:, :1], cuts[:, 1:]
+    in_segment = (positions >= i) & (positions < j)
+    # Какие точки уже взяты из первого родителя:
+    taken = np.zeros((count, n), dtype=bool)
+    taken[rows, first] = in_segment
+    # Второй родитель, начиная с позиции j, без взятых точек (устойчивая сортировка сохраняет порядок):
+    rotated = np.take_along_axis(second, (j + positions) % n, axis=1)
+    order = np.argsort(taken[rows, rotated], axis=1, kind='stable')
+    fill = np.take_along_axis(rotated, order, axis=1)
+    child = first.copy()
+    free = positions < (n - (j - i))
+    targets = (j + positions) % n
+    child[np.broadcast_to(rows, (count, n))[free], targets[free]] = fill[free]
+    return child
+
+
+def mutate(population, rate, rng):
+    """
+    Мутация разворотом участка: у доли rate маршрутов разворачивается случайный участок.
+    :type population: numpy.ndarray
+    :type rate: float
+    :type rng: numpy.random.Generator
+    :rtype: numpy.ndarray
+    """
+    count, n = population.shape
+    selected = np.flatnonzero(rng.random(count) < rate)
+    if len(selected) == 0:
+        return population
+    cuts = np.sort(rng.integers(0, n, size=(len(selected), 2)), axis=1)
+    i, j = cuts[:, :1], cuts[:, 1:]
+    positions = np.arange(n)
+    inside = (positions >= i) & (positions <= j)
+    index = np.where(inside, i + j - positions, positions)
+    population[selected] = np.take_along_axis(population[selected], index, axis=1)
+    return population
+
+
+def solve_genetic(matrix, population_size=200, generations=500, elite=4, mutation_rate=0.3,
+                  seed=None, route=None, lower_bound=None, tolerance=0.0, stats=None):
+    """
+    Ищет короткий маршрут генетическим алгоритмом.
+    :param matrix: матрица расстояний n x n
+    :param population_size: размер популяции P
+    :param generations: количество поколений
+    :param elite: сколько лучших маршрутов переходит в следующее поколение без изменений
+    :param mutation_rate: доля потомков, подвергаемых мутации
+    :param seed: начальное значение генератора случайных чисел
+    :param route: маршрут, добавляемый в начальную популяцию (например, жадный)
+    :param lower_bound: нижняя оценка длины маршрута (см. bound.calculate_lower_bound)
+    :param tolerance: допустимое отклонение от нижней оценки, при достижении которого поиск прекращается
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :return: лучший маршрут (начиная с точки 0) и его длина
+    :rtype: (tuple, float)
+    """
+    n = len(matrix)
+    if n < 4:
+        route = tuple(range(n))
+        return route, float(sum(matrix[route[i - 1]][route[i]] for i in range(n)))
+    rng = np.random.default_rng(seed)
+    population = create_population(population_size, n, rng)
+    if route is not None:
+        population[0] = route
+    lengths = calculate_fitness(matrix, population)
+    children_count = population_size - elite
+    if stats is not None and lower_bound is not None:
+        stats.record_bound(lower_bound, 'lower')
+    recorded = np.inf
+    done = 0
+    for _ in range(generations):
+        if stats is not None and lengths.min() < recorded:
+            recorded = lengths.min()
+            stats.record_bound(recorded)
+        if lower_bound is not None and calculate_gap(lengths.min(), lower_bound) <= tolerance:
+            break
+        done += 1
+        best = np.argsort(lengths)[:elite]
+        parents = select_parents(lengths, 2 * children_count, rng)
+        children = crossover(population[parents[:children_count]], population[parents[children_count:]], rng)
+        children = mutate(children, mutation_rate, rng)
+        population = np.concatenate([population[best], children])
+        lengths = calculate_fitness(matrix, population)
+    best = int(np.argmin(lengths))
+    if stats is not None:
+        stats.add('generations', done)
+        stats.add('routes_evaluated', len(population) * (done + 1))
+        if lengths[best] < recorded:
+            stats.record_bound(lengths[best])
+    route = population[best]
+    start = int(np.flatnonzero(route == 0)[0])
+    return tuple(np.roll(route, -start).tolist()), float(lengths[best])
+
+
+def main(data, stats=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
+    with measure_phase(stats, 'matrix'):
+        matrix = create_distance_matrix(points)
+
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(matrix)
+    with measure_phase(stats, 'search'):
+        route, length = solve_genetic(matrix, seed=0, lower_bound=bound, stats=stats)
+
+    with measure_phase(stats, 'format'):
+        result = create_result_row(matrix.tolist(), route)
+    print(format_result_string(result))
+    print(format_gap_string(length, bound))
+    return result, stats
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
@@ -0,0 +1,263 @@
+"""Добавление и удаление остановок в уже построенном маршруте без решения задачи заново.
+Маршрут хранится двусвязным списком (массивы следующих и предыдущих точек), поэтому
+вставка и удаление точки стоят O(1).
+- Новая остановка вставляется дешевейшей вставкой: кандидаты - ближайшие остановки по сеточному
+  индексу (модуль spatial) и остановки, добавленные после его построения; проверяются дуги
+  до и после каждого кандидата. Индекс перестраивается, когда добавленных остановок
+  становится больше REBUILD_POINTS.
+- Удаляемая остановка вырезается, ее соседи соединяются напрямую.
+- После каждого изменения участок маршрута из WINDOW точек по обе стороны от места изменения
+  улучшается ходами 2-opt и переносом точки (концы участка закреплены), поэтому стоимость
+  одной операции ограничена и не зависит от количества остановок."""
+
+
+from math import hypot
+
+import numpy as np
+
+from construction import create_greedy_route
+from distance import points_to_array
+from local_search import EPSILON, find_nearest_neighbours, optimize_route
+from postman_2 import format_result_string
+from spatial import GridIndex
+
+
+# Сколько точек по обе стороны от места изменения улучшается локальным поиском:
+WINDOW = 20
+
+# Сколько остановок можно добавить до перестроения сеточного индекса:
+REBUILD_POINTS = 256
+
+
+def improve_path(path, dist):
+    """
+    Улучшает путь с закрепленными концами ходами 2-opt и переносом одной точки
+    до локального минимума. Возвращает улучшенный путь и уменьшение длины.
+    :type path: list
+    :type dist: function
+    :rtype: (list, float)
+    """
+    path = list(path)
+    m = len(path)
+    total = 0.0
+    improved = True
+    while improved:
+        improved = False
+        # 2-opt: разворот участка path[i + 1..j]:
+        for i in range(m - 3):
+            a, b = path[i], path[i + 1]
+            d_ab = dist(a, b)
+            for j in range(i + 2, m - 1):
+                c, d = path[j], path[j + 1]
+                delta = dist(a, c) + dist(b, d) - d_ab - dist(c, d)
+                if delta < -EPSILON:
+                    path[i + 1:j + 1] = path[j:i:-1]
+                    total -= delta
+                    improved = True
+                    b = path[i + 1]
+                    d_ab = dist(a, b)
+        # Перенос точки path[i] между path[j] и path[j + 1]:
+        for i in range(1, m - 1):
+            p, x, nx = path[i - 1], path[i], path[i + 1]
+            gain = dist(p, x) + dist(x, nx) - dist(p, nx)
+            for j in range(m - 1):
+                if j == i or j == i - 1:
+                    continue
+                a, b = path[j], path[j + 1]
+                delta = dist(a, x) + dist(x, b) - dist(a, b) - gain
+                if delta < -EPSILON:
+                    path.pop(i)
+                    path.insert(j + 1 if j < i else j, x)
+                    total -= delta
+                    improved = True
+                    break
+    return path, total
+
+
+class DynamicRoute:
+    """Маршрут, в который можно добавлять и из которого можно удалять остановки"""
+
+    def __init__(self, points, route=None, k=10, window=WINDOW):
+        """
+        :param points: словарь точек или массив координат n x 2
+        :param route: начальный маршрут (по умолчанию - жадное построение и локальный поиск)
+        :param k: количество ближайших остановок - кандидатов для вставки
+        :param window: сколько точек по обе стороны от места изменения улучшается
+        """
+        coords = points_to_array(points)
+        n = len(coords)
+        self.xs = coords[:, 0].tolist()
+        self.ys = coords[:, 1].tolist()
+        self.k = k
+        self.window = window
+        if route is None:
+            route = create_greedy_route(coords)[0].tolist()
+            if n >= 4:
+                route = optimize_route(route, self.dist, find_nearest_neighbours(coords, min(k, n - 1)))
+        route = [int(x) for x in route]
+        self.succ = [-1] * n
+        self.pred = [-1] * n
+        for i, city in enumerate(route):
+            self.succ[city] = route[(i + 1) % n]
+            self.pred[city] = route[i - 1]
+        self.count = n
+        self.length = sum(self.dist(route[i - 1], route[i]) for i in range(n)) if n > 1 else 0.0
+        self.rebuild_index()
+
+    def dist(self, i, j):
+        """Расстояние между остановками i и j"""
+        return hypot(self.xs[i] - self.xs[j], self.ys[i] - self.ys[j])
+
+    def is_active(self, stop):
+        """Входит ли остановка в маршрут"""
+        return 0 <= stop < len(self.succ) and self.succ[stop] >= 0
+
+    def rebuild_index(self):
+        """
+        Перестраивает сеточный индекс по остановкам маршрута
+        :return: None
+        """
+        self.indexed = np.flatnonzero(np.array(self.succ) >= 0)
+        self.index = GridIndex(np.column_stack([np.array(self.xs)[self.indexed], np.array(self.ys)[self.indexed]]))
+        self.recent = []
+
+    def find_candidates(self, x, y):
+        """
+        Возвращает ближайшие к точке (x, y) остановки маршрута - кандидаты для вставки
+        :type x: float
+        :type y: float
+        :rtype: list
+        """
+        found = []
+        if len(self.indexed):
+            nearest = self.index.query(np.array([[x, y]]), 2 * self.k)[0][0]
+            found = [stop for stop in self.indexed[nearest].tolist() if self.succ[stop] >= 0][:self.k]
+        found += [stop for stop in self.recent if self.succ[stop] >= 0]
+        if not found:
+            found = [stop for stop in range(len(self.succ)) if self.succ[stop] >= 0]
+        return found
+
+    def insert(self, point):
+        """
+        Добавляет остановку с координатами point дешевейшей вставкой и улучшает маршрут
+        вокруг нее. Возвращает номер новой остановки.
+        :type point: (float, float)
+        :rtype: int
+        """
+        x, y = float(point[0]), float(point[1])
+        candidates = self.find_candidates(x, y) if self.count else []
+        stop = len(self.succ)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.succ.append(stop)
+        self.pred.append(stop)
+        if candidates:
+            best = None
+            for c in candidates:
+                for a, b in ((self.pred[c], c), (c, self.succ[c])):
+                    added = self.dist(a, stop) + self.dist(stop, b) - (self.dist(a, b) if a != b else 0.0)
+                    if best is None or added < best[0]:
+                        best = (added, a, b)
+            added, a, b = best
+            self.succ[a], self.pred[stop], self.succ[stop], self.pred[b] = stop, a, b, stop
+            self.length += added
+        self.count += 1
+        self.recent.append(stop)
+        if len(self.recent) > REBUILD_POINTS:
+            self.rebuild_index()
+        self.reoptimize(stop)
+        return stop
+
+    def remove(self, stop):
+        """
+        Удаляет остановку из маршрута и улучшает маршрут вокруг места удаления
+        :type stop: int
+        :return: None
+        """
+        if not self.is_active(stop):
+            raise ValueError(f'Остановки {stop} нет в маршруте')
+        a, b = self.pred[stop], self.succ[stop]
+        if a != stop:
+            self.length += self.dist(a, b) - self.dist(a, stop) - self.dist(stop, b)
+            self.succ[a], self.pred[b] = b, a
+        self.succ[stop] = self.pred[stop] = -1
+        self.count -= 1
+        if self.count == 0:
+            self.length = 0.0
+        elif a != stop:
+            self.reoptimize(a)
+
+    def reoptimize(self, stop):
+        """
+        Улучшает участок маршрута из window точек по обе стороны от остановки stop
+        :type stop: int
+        :return: None
+        """
+        if self.count < 5:
+            return
+        start = stop
+        for _ in range(min(self.window, (self.count - 2) // 2)):
+            start = self.pred[start]
+        path = [start]
+        for _ in range(min(2 * self.window, self.count - 2)):
+            path.append(self.succ[path[-1]])
+        end_next = self.succ[path[-1]]
+        path.append(end_next)
+        path, gain = improve_path(path, self.dist)
+        if gain <= 0:
+            return
+        for a, b in zip(path, path[1:]):
+            self.succ[a], self.pred[b] = b, a
+        self.length -= gain
+
+    def get_route(self, start=0):
+        """
+        Возвращает маршрут - список остановок, начиная с start (или с первой остановки маршрута,
+        если start удалена)
+        :type start: int
+        :rtype: list
+        """
+        if not self.count:
+            return []
+        if not self.is_active(start):
+            start = next(stop for stop in range(len(self.succ)) if self.succ[stop] >= 0)
+        route = [start]
+        current = self.succ[start]
+        while current != start:
+            route.append(current)
+            current = self.succ[current]
+        return route
+
+    def get_result(self):
+        """
+        Возвращает маршрут в формате функции format_result_string
+        :rtype: list
+        """
+        route = self.get_route()
+        lengths = [self.dist(route[i], route[(i + 1) % len(route)]) for i in range(len(route))]
+        return [tuple(route)] + lengths + [sum(lengths)]
+
+
+def main(data):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+
+    route = DynamicRoute(points)
+    stop = route.insert((4, 0))
+    route.remove(3)
+    print(format_result_string(route.get_result()))
+    route.remove(stop)
+    print(format_result_string(route.get_result()))
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
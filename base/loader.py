@@ -0,0 +1,247 @@
+"""Загрузка больших наборов точек из файлов CSV и двоичных файлов.
+В DATA точки - ключи словаря, поэтому две остановки по одному адресу незаметно сливаются в одну.
+Здесь координаты читаются в непрерывный массив n x 2 (float64), названия остановок - в отдельный
+массив, а совпадающие координаты объединяются явно: возвращается соответствие исходных остановок
+объединенным точкам, по которому маршрут разворачивается обратно на все остановки.
+- CSV читается порциями по CHUNK_BYTES: числовая порция разбирается целиком в NumPy (np.fromstring),
+  порция с текстовыми полями - одной операцией split, без разбора строки за строкой;
+  количество полей в строках и координаты проверяются, ошибка называет номер строки,
+  поэтому 10 миллионов строк читаются за секунды.
+- Двоичный файл - подряд идущие пары x, y в формате little-endian (float64 или float32);
+  он отображается в память без чтения целиком."""
+
+
+from itertools import repeat
+import os
+import tempfile
+import warnings
+
+import numpy as np
+
+from local_search import improve_route
+from postman_2 import format_result_string
+
+
+# Размер порции чтения CSV (байт):
+CHUNK_BYTES = 1 << 24
+
+
+def find_line(lines, row, first):
+    """
+    Возвращает номер в файле непустой строки порции с номером row (с 0 среди непустых строк)
+    :param lines: строки порции
+    :type row: int
+    :param first: номер первой строки порции в файле
+    :rtype: int
+    """
+    for index, line in enumerate(lines):
+        if line.strip():
+            if row == 0:
+                return first + index
+            row -= 1
+    raise IndexError(row)
+
+
+def parse_csv_chunk(text, delimiter, columns, coordinate_columns, first=1):
+    """
+    Разбивает порцию CSV (целые строки) на массив полей размерностью строк x столбцов
+    и возвращает его вместе с массивом координат строк x 2 (float64). Пустые строки пропускаются.
+    Если все поля - числа, они разбираются сразу в float64 без промежуточных строк.
+    Строка с другим количеством полей или нечисловой координатой - ошибка ValueError с номером строки.
+    :type text: str
+    :type delimiter: str
+    :type columns: int
+    :param coordinate_columns: номера столбцов координат x и y
+    :param first: номер первой строки порции в файле (с 1)
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    lines = text.replace('\r', '').split('\n')
+    rows = [line for line in lines if line.strip()]
+    counts = np.fromiter(map(str.count, rows, repeat(delimiter)), dtype=np.int64, count=len(rows))
+    bad = np.flatnonzero(counts != columns - 1)
+    if len(bad):
+        number = find_line(lines, int(bad[0]), first)
+        raise ValueError(f'Строка {number}: ожидается полей: {columns}, получено {lines[number - first].strip()!r}')
+    text = delimiter.join(rows)
+    with warnings.catch_warnings():
+        # Старые версии NumPy на нечисловом поле не вызывают ошибку, а обрезают результат
+        # с предупреждением, поэтому результат проверяется по количеству полей:
+        warnings.simplefilter('ignore', DeprecationWarning)
+        try:
+            table = np.fromstring(text, sep=delimiter)
+        except ValueError:
+            table = None
+    if table is None or len(table) != len(rows) * columns:
+        table = np.array(text.split(delimiter))
+    table = table.reshape(-1, columns)
+    fields = table[:, list(coordinate_columns)]
+    try:
+        return table, fields.astype(np.float64)
+    except ValueError:
+        for row, values in enumerate(fields.tolist()):
+            try:
+                [float(x) for x in values]
+            except ValueError:
+                number = find_line(lines, row, first)
+                raise ValueError(f'Строка {number}: нечисловая координата в {lines[number - first].strip()!r}') from None
+        raise
+
+
+def load_csv(path, x_column=0, y_column=1, label_column=None, delimiter=',', header=None):
+    """
+    Читает координаты (и, если задан столбец, названия) точек из файла CSV без кавычек.
+    :param path: путь к файлу
+    :param x_column: номер столбца координаты x
+    :param y_column: номер столбца координаты y
+    :param label_column: номер столбца названия остановки
+    :param delimiter: разделитель полей
+    :param header: есть ли строка заголовка (по умолчанию определяется по первой строке)
+    :return: массив координат n x 2 и массив названий (или None)
+    :rtype: (numpy.ndarray, numpy.ndarray or None)
+    """
+    coords, labels = [], []
+    with open(path, encoding='utf-8') as file:
+        first = file.readline()
+        columns = first.count(delimiter) + 1
+        fields = first.rstrip('\r\n').split(delimiter)
+        if header is None:
+            try:
+                float(fields[x_column]), float(fields[y_column])
+                header = False
+            except ValueError:
+                header = True
+        rest = '' if header else first
+        # Номер в файле первой строки очередной порции:
+        number = 2 if header else 1
+        while True:
+            block = file.read(CHUNK_BYTES)
+            if not block and not rest:
+                break
+            text = rest + block
+            # Порция заканчивается на последнем целом переводе строки:
+            end = text.rfind('\n') + 1 if block else len(text)
+            text, rest = text[:end], text[end:]
+            first_line, number = number, number + text.count('\n')
+            if not text.strip():
+                continue
+            table, chunk = parse_csv_chunk(text, delimiter, columns, (x_column, y_column), first_line)
+            coords.append(chunk)
+            if label_column is not None:
+                labels.append(table[:, label_column])
+    coords = np.concatenate(coords) if coords else np.empty((0, 2))
+    if label_column is None:
+        return coords, None
+    return coords, np.concatenate(labels) if labels else np.empty(0, dtype=str)
+
+
+def load_binary(path, dtype='<f8', mmap=True):
+    """
+    Читает двоичный файл пар координат x, y в формате little-endian.
+    :param path: путь к файлу
+    :param dtype: тип координаты ('<f8' или '<f4')
+    :param mmap: отобразить файл в память только для чтения (иначе - прочитать в float64)
+    :rtype: numpy.ndarray
+    """
+    if mmap:
+        return np.memmap(path, dtype=np.dtype(dtype), mode='r').reshape(-1, 2)
+    return np.fromfile(path, dtype=np.dtype(dtype)).reshape(-1, 2).astype(np.float64)
+
+
+def merge_duplicates(coords):
+    """
+    Объединяет точки с одинаковыми координатами. Объединенные точки идут в порядке первого
+    появления, поэтому точка 0 (почтовое отделение) остается точкой 0.
+    Точки группируются по точным значениям координат, без хешей: сортировка по x,
+    и только точки с одинаковым x дополнительно упорядочиваются по y.
+    :param coords: массив координат n x 2
+    :return: массив различных координат m x 2 и массив длины n - номер объединенной точки
+        для каждой исходной остановки
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    # + 0.0 приводит -0.0 к 0.0:
+    coords = np.ascontiguousarray(coords, dtype=np.float64) + 0.0
+    n = len(coords)
+    if n == 0:
+        return coords.reshape(0, 2), np.empty(0, dtype=np.int64)
+    x, y = coords[:, 0], coords[:, 1]
+    order = np.argsort(x)
+    xs = x[order]
+    tied = xs[1:] == xs[:-1]
+    if tied.any():
+        # Серии точек с одинаковым x сортируются по y:
+        run = np.cumsum(np.concatenate([[True], ~tied]))
+        inside = np.flatnonzero(np.concatenate([tied, [False]]) | np.concatenate([[False], tied]))
+        part = order[inside]
+        order[inside] = part[np.lexsort((y[part], run[inside]))]
+    ys = y[order]
+    changed = ~tied | (ys[1:] != ys[:-1])
+    # Наименьший исходный номер в каждой группе одинаковых точек:
+    first = np.minimum.reduceat(order, np.flatnonzero(np.concatenate([[True], changed])))
+    # Нумерация объединенных точек в порядке первого появления:
+    is_first = np.zeros(n, dtype=bool)
+    is_first[first] = True
+    rank = np.cumsum(is_first) - 1
+    inverse = np.empty(n, dtype=np.int64)
+    inverse[order] = rank[first][np.cumsum(np.concatenate([[0], changed]))]
+    return coords[is_first], inverse
+
+
+def expand_route(route, mapping):
+    """
+    Переводит маршрут по объединенным точкам в маршрут по всем исходным остановкам:
+    остановки с одинаковыми координатами посещаются подряд.
+    :param route: маршрут по объединенным точкам
+    :param mapping: номер объединенной точки для каждой исходной остановки
+    :rtype: numpy.ndarray
+    """
+    position = np.empty(len(route), dtype=np.int64)
+    position[np.asarray(route)] = np.arange(len(route))
+    return np.argsort(position[mapping], kind='stable')
+
+
+def load_points(path, **kwargs):
+    """
+    Загружает точки из файла по расширению: .csv и .txt - CSV, остальные - двоичный файл.
+    Совпадающие координаты объединяются.
+    :param path: путь к файлу
+    :param kwargs: параметры load_csv или load_binary
+    :return: различные координаты, названия исходных остановок (или None) и соответствие
+        исходных остановок объединенным точкам
+    :rtype: (numpy.ndarray, numpy.ndarray or None, numpy.ndarray)
+    """
+    if path.lower().endswith(('.csv', '.txt')):
+        coords, labels = load_csv(path, **kwargs)
+    else:
+        coords, labels = load_binary(path, **kwargs), None
+    coords, mapping = merge_duplicates(coords)
+    return coords, labels, mapping
+
+
+def main(path, **kwargs):
+    # Различные точки, названия остановок и соответствие остановок точкам:
+    coords, labels, mapping = load_points(path, **kwargs)
+
+    result = improve_route(coords)
+    route = expand_route(result[0], mapping)
+
+    print(f'Остановок: {len(mapping)}, различных адресов: {len(coords)}')
+    print(format_result_string(result))
+    print(route.tolist() if labels is None else labels[route].tolist())
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    # Остановки в формате CSV: две последние - по одному адресу
+    DATA = """x,y,name
+0,2,Почтовое отделение
+2,5,Ул. Грибоедова
+5,2,Ул. Бейкер стрит
+6,6,Ул. Большая Садовая
+8,3,Вечнозелёная Аллея
+6,6,Ул. Большая Садовая (второй подъезд)
+"""
+    PATH = os.path.join(tempfile.gettempdir(), 'points.csv')
+    with open(PATH, 'w', encoding='utf-8') as file:
+        file.write(DATA)
+
+    main(PATH, label_column=2)
@@ -0,0 +1,243 @@
+"""Улучшение готового маршрута локальным поиском: ходы 2-opt и Or-opt.
+Все модули с полным перебором и методом Литтла точные и экспоненциальные, а для
+ежедневных наборов из 2 000 - 50 000 точек нужен приближенный, но быстрый метод.
+Чтобы работа оставалась почти линейной:
+- ходы ищутся только среди k ближайших соседей каждой точки (списки кандидатов
+  строятся по сеточному индексу из модуля spatial);
+- используются биты "не смотреть" (don't-look bits): точка, у которой не нашлось
+  улучшающего хода, не проверяется, пока не изменится одна из ее дуг.
+Маршрут хранится массивом с обратным индексом позиций, а на больших наборах - двухуровневым
+списком с разворотом участка за O(sqrt(n)) (модуль tour); ход Or-opt (перенос участка
+из 1-3 точек в другое место, в том числе с разворотом) выполняется как 2-3 хода 2-opt.
+Полная матрица расстояний не нужна: расстояния считаются по координатам."""
+
+
+from collections import deque
+
+import numpy as np
+
+from bound import calculate_lower_bound, format_gap_string
+from distance import calculate_route_lengths, create_coordinate_distance, create_distance_matrix, points_to_array
+from postman_2 import format_result_string
+from spatial import GridIndex
+from stats import SearchStats, measure_phase
+from tour import TourArray, TwoLevelTour
+
+
+# Минимальное улучшение, которое считается улучшением (защита от зацикливания на ошибках округления):
+EPSILON = 1e-10
+
+# Начиная с какого количества точек маршрут хранится двухуровневым списком:
+TWO_LEVEL_THRESHOLD = 1000
+
+
+def find_nearest_neighbours(points, k):
+    """
+    Возвращает массив n x k (int32) номеров ближайших точек для каждой точки (по возрастанию
+    расстояния, без самой точки). Используется сеточный индекс, полная матрица не считается.
+    :param points: словарь точек или массив координат n x 2
+    :type k: int
+    :rtype: numpy.ndarray
+    """
+    return GridIndex(points).knn(k)
+
+
+def try_2opt(tour, dist, neighbours, a):
+    """
+    Ищет улучшающий ход 2-opt, добавляющий дугу от a к одному из ее ближайших соседей,
+    и выполняет первый найденный. Возвращает список точек, дуги которых изменились, или None.
+    :type tour: TourArray
+    :type dist: function
+    :type neighbours: list
+    :type a: int
+    :rtype: list or None
+    """
+    for succ in (True, False):
+        b = tour.next(a) if succ else tour.prev(a)
+        d_ab = dist(a, b)
+        for c in neighbours[a]:
+            d_ac = dist(a, c)
+            if d_ac >= d_ab:
+                break
+            e = tour.next(c) if succ else tour.prev(c)
+            if c == b or e == a:
+                continue
+            delta = d_ac + dist(b, e) - d_ab - dist(c, e)
+            if delta < -EPSILON:
+                tour.make_2opt(a, b, c, e)
+                return [a, b, c, e]
+    return None
+
+
+def move_segment(tour, s1, s2, c, e, reverse):
+    """
+    Переносит участок s1..s2 (в прямом направлении) между соседними точками c и e (e следует за c).
+    В результате получается c s1..s2 e или, если reverse, c s2..s1 e.
+    :type tour: TourArray
+    :return: None
+    """
+    p = tour.prev(s1)
+    nx = tour.next(s2)
+    tour.make_2opt(p, s1, c, e)
+    tour.make_2opt(p, c, nx, s2)
+    if not reverse and s1 != s2:
+        tour.make_2opt(c, s2, s1, e)
+
+
+def try_or_opt(tour, dist, neighbours, a, max_length=3):
+    """
+    Ищет улучшающий перенос участка из 1..max_length точек, один из концов которого - a,
+    к одному из ближайших соседей a, и выполняет первый найденный.
+    Возвращает список точек, дуги которых изменились, или None.
+    :type tour: TourArray
+    :type dist: function
+    :type neighbours: list
+    :type a: int
+    :type max_length: int
+    :rtype: list or None
+    """
+    if tour.n < max_length + 3:
+        return None
+    for length in range(1, max_length + 1):
+        # Участки, начинающиеся в a и заканчивающиеся в a:
+        first = a
+        for _ in range(length - 1):
+            first = tour.prev(first)
+        for s1 in ((a,) if first == a else (a, first)):
+            segment = [s1]
+            for _ in range(length - 1):
+                segment.append(tour.next(segment[-1]))
+            s2 = segment[-1]
+            p = tour.prev(s1)
+            nx = tour.next(s2)
+            gain = dist(p, s1) + dist(s2, nx) - dist(p, nx)
+            if gain <= EPSILON:
+                continue
+            for c in neighbours[a]:
+                if dist(a, c) >= gain:
+                    break
+                if c in segment:
+                    continue
+                # Вставка между c и следующей за ней точкой или между предыдущей точкой и c,
+                # так чтобы a оказалась рядом с c:
+                for left, right in ((c, tour.next(c)), (tour.prev(c), c)):
+                    if right in segment or left in segment or right == p or left == nx:
+                        continue
+                    reverse = (a == s1) != (left == c)
+                    if reverse:
+                        added = dist(left, s2) + dist(s1, right)
+                    else:
+                        added = dist(left, s1) + dist(s2, right)
+                    delta = added - dist(left, right) - gain
+                    if delta < -EPSILON:
+                        move_segment(tour, s1, s2, left, right, reverse)
+                        return [p, nx, s1, s2, left, right]
+    return None
+
+
+def optimize_route(route, dist, neighbours, or_opt=True, tour_class=None, active=None, stats=None):
+    """
+    Улучшает маршрут ходами 2-opt и Or-opt до локального минимума.
+    Очередь точек с неустановленными битами "не смотреть" обрабатывается, пока не опустеет.
+    :param route: начальный маршрут - последовательность номеров всех точек
+    :param dist: функция расстояния dist(i, j)
+    :param neighbours: списки кандидатов (массив n x k или список списков)
+    :param or_opt: использовать ли ходы Or-opt
+    :param tour_class: представление маршрута (по умолчанию выбирается по количеству точек)
+    :param active: точки, с которых начинается очередь (по умолчанию - все точки маршрута)
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :return: улучшенный маршрут, начиная с точки 0
+    :rtype: list
+    """
+    route = list(route)
+    if tour_class is None:
+        tour_class = TwoLevelTour if len(route) >= TWO_LEVEL_THRESHOLD else TourArray
+    tour = tour_class(route)
+    if tour.n < 4:
+        return tour.to_list()
+    if isinstance(neighbours, np.ndarray):
+        neighbours = neighbours.tolist()
+    if active is None:
+        queue = deque(route)
+        in_queue = [True] * tour.n
+    else:
+        queue = deque(dict.fromkeys(int(x) for x in active))
+        in_queue = [False] * tour.n
+        for city in queue:
+            in_queue[city] = True
+    expanded = moves_2opt = moves_or_opt = 0
+    while queue:
+        a = queue.popleft()
+        in_queue[a] = False
+        expanded += 1
+        touched = try_2opt(tour, dist, neighbours, a)
+        if touched is None and or_opt:
+            touched = try_or_opt(tour, dist, neighbours, a)
+            moves_or_opt += touched is not None
+        else:
+            moves_2opt += touched is not None
+        if touched is None:
+            continue
+        for city in touched:
+            if not in_queue[city]:
+                in_queue[city] = True
+                queue.append(city)
+    if stats is not None:
+        stats.add('nodes_expanded', expanded)
+        stats.add('moves_2opt', moves_2opt)
+        stats.add('moves_or_opt', moves_or_opt)
+    return tour.to_list()
+
+
+def improve_route(points, route=None, k=10, or_opt=True, stats=None):
+    """
+    Улучшает маршрут по координатам точек. Возвращает список из кортежа маршрута, расстояний
+    между соседними точками и суммы маршрута - в формате функции format_result_string.
+    :param points: словарь точек или массив координат n x 2
+    :param route: начальный маршрут (по умолчанию - точки по порядку номеров)
+    :param k: количество ближайших соседей в списках кандидатов
+    :param or_opt: использовать ли ходы Or-opt
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :rtype: list
+    """
+    coords = points_to_array(points)
+    if route is None:
+        route = range(len(coords))
+    with measure_phase(stats, 'neighbours'):
+        neighbours = find_nearest_neighbours(coords, k)
+    with measure_phase(stats, 'search'):
+        result = optimize_route(route, create_coordinate_distance(coords), neighbours, or_opt, stats=stats)
+    lengths = calculate_route_lengths(coords, result).tolist()
+    if stats is not None:
+        stats.record_bound(sum(lengths))
+    return [tuple(result)] + lengths + [sum(lengths)]
+
+
+def main(data, stats=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
+
+    result = improve_route(points, stats=stats)
+
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(create_distance_matrix(points))
+
+    print(format_result_string(result))
+    print(format_gap_string(result[-1], bound))
+    return result, stats
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
@@ -0,0 +1,196 @@
+"""Многократный запуск локального поиска на нескольких процессах.
+Независимые запуски 2-opt/Or-opt из разных случайных начальных маршрутов дают лучший
+результат, чем один запуск, но передача матрицы n x n каждому процессу через pickle
+съедает весь выигрыш. Поэтому матрица расстояний и списки ближайших соседей один раз
+кладутся в разделяемую память (multiprocessing.shared_memory), а процессы пула
+подключаются к ней по имени и читают без копирования.
+Начальный маршрут каждого запуска - рандомизированный ближайший сосед со случайной
+стартовой точки. Генератор каждого запуска инициализируется парой (seed, номер запуска),
+а лучший маршрут выбирается по (длине, номеру запуска), поэтому при одинаковых seed
+и количестве запусков результат не зависит от количества процессов и порядка их работы."""
+
+
+from multiprocessing import Pool, shared_memory
+import os
+
+import numpy as np
+
+from bound import calculate_lower_bound, format_gap_string
+from distance import create_distance_matrix
+from local_search import optimize_route
+from postman_2 import create_result_row, format_result_string
+from stats import SearchStats, measure_phase
+
+
+# Состояние процесса пула: массивы в разделяемой памяти (заполняется в init_worker)
+WORKER_STATE = {}
+
+# Из скольких ближайших непосещенных точек случайно выбирается следующая при построении начального маршрута:
+RANDOM_CHOICES = 3
+
+
+def share_array(array):
+    """
+    Копирует массив в новый блок разделяемой памяти. Возвращает блок и описание массива
+    (имя блока, размерность, тип), по которому процессы подключаются к нему.
+    :type array: numpy.ndarray
+    :rtype: (multiprocessing.shared_memory.SharedMemory, tuple)
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    view[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach_array(spec):
+    """
+    Подключается к массиву в разделяемой памяти по описанию из share_array.
+    Процессы пула работают с resource_tracker родителя, поэтому блок удаляет только создавший процесс.
+    :type spec: tuple
+    :rtype: (multiprocessing.shared_memory.SharedMemory, numpy.ndarray)
+    """
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def init_worker(matrix_spec, neighbours_spec):
+    """
+    Инициализирует процесс пула: подключает матрицу расстояний и списки соседей
+    :type matrix_spec: tuple
+    :type neighbours_spec: tuple
+    :return: None
+    """
+    WORKER_STATE['matrix_block'], WORKER_STATE['matrix'] = attach_array(matrix_spec)
+    WORKER_STATE['neighbours_block'], neighbours = attach_array(neighbours_spec)
+    WORKER_STATE['neighbours'] = neighbours.tolist()
+
+
+def create_random_route(matrix, rng):
+    """
+    Строит маршрут рандомизированным ближайшим соседом: начиная со случайной точки,
+    следующая точка выбирается случайно среди RANDOM_CHOICES ближайших непосещенных.
+    :type matrix: numpy.ndarray
+    :type rng: numpy.random.Generator
+    :rtype: list
+    """
+    n = len(matrix)
+    visited = np.zeros(n, dtype=bool)
+    current = int(rng.integers(n))
+    route = [current]
+    visited[current] = True
+    for left in range(n - 1, 0, -1):
+        row = np.where(visited, np.inf, matrix[current])
+        choices = min(RANDOM_CHOICES, left)
+        nearest = np.argpartition(row, choices - 1)[:choices]
+        current = int(nearest[rng.integers(choices)])
+        route.append(current)
+        visited[current] = True
+    return route
+
+
+def run_start(task):
+    """
+    Выполняет один запуск: начальный маршрут и локальный поиск. Выполняется в процессе пула.
+    Возвращает кортеж (длина, номер запуска, маршрут, счетчики локального поиска или None).
+    :param task: кортеж (seed, номер запуска, собирать ли статистику)
+    :rtype: tuple
+    """
+    seed, index, collect = task
+    matrix = WORKER_STATE['matrix']
+    rng = np.random.default_rng([seed, index])
+    route = create_random_route(matrix, rng)
+    item = matrix.item
+    stats = SearchStats() if collect else None
+    route = optimize_route(route, lambda i, j: item(i, j), WORKER_STATE['neighbours'], stats=stats)
+    length = float(matrix[route, np.roll(route, -1)].sum())
+    return length, index, route, stats and stats.counters
+
+
+def solve_multistart(matrix, starts=8, processes=None, seed=0, k=10, stats=None):
+    """
+    Выполняет starts независимых запусков локального поиска на пуле процессов
+    с общей матрицей расстояний в разделяемой памяти.
+    :param matrix: матрица расстояний n x n
+    :param starts: количество запусков
+    :param processes: количество процессов (по умолчанию - количество ядер)
+    :param seed: начальное значение генераторов случайных чисел
+    :param k: количество ближайших соседей в списках кандидатов
+    :param stats: объект SearchStats для сбора статистики (модуль stats): счетчики локального
+        поиска суммируются по всем запускам
+    :return: лучший маршрут (начиная с точки 0) и его длина
+    :rtype: (list, float)
+    """
+    matrix = np.ascontiguousarray(matrix)
+    n = len(matrix)
+    if n < 4:
+        route = list(range(n))
+        return route, float(matrix[route, np.roll(route, -1)].sum())
+    k = min(k, n - 1)
+    with measure_phase(stats, 'neighbours'):
+        masked = matrix.copy()
+        np.fill_diagonal(masked, np.inf)
+        part = np.argpartition(masked, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(masked, part, axis=1), axis=1)
+        neighbours = np.take_along_axis(part, order, axis=1).astype(np.int32)
+        del masked
+    blocks = []
+    try:
+        matrix_block, matrix_spec = share_array(matrix)
+        blocks.append(matrix_block)
+        neighbours_block, neighbours_spec = share_array(neighbours)
+        blocks.append(neighbours_block)
+        tasks = [(seed, index, stats is not None) for index in range(starts)]
+        best = None
+        with measure_phase(stats, 'starts'):
+            with Pool(processes or os.cpu_count(), initializer=init_worker,
+                      initargs=(matrix_spec, neighbours_spec)) as pool:
+                for result in pool.imap_unordered(run_start, tasks):
+                    if stats is not None:
+                        stats.add('starts')
+                        for name, value in result[3].items():
+                            stats.add(name, value)
+                        if best is None or result[0] < best[0]:
+                            stats.record_bound(result[0])
+                    if best is None or result[:2] < best[:2]:
+                        best = result
+        length, _, route, _ = best
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return route, length
+
+
+def main(data, starts=8, stats=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
+    with measure_phase(stats, 'matrix'):
+        matrix = create_distance_matrix(points)
+
+    with measure_phase(stats, 'search'):
+        route, length = solve_multistart(matrix, starts=starts, stats=stats)
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(matrix)
+
+    with measure_phase(stats, 'format'):
+        result = create_result_row(matrix.tolist(), route)
+    print(format_result_string(result))
+    print(format_gap_string(length, bound))
+    return result, stats
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
@@ -3,31 +3,10 @@
 
 import math
 from itertools import permutations
-import timeit
-import cProfile
 
-
-def calculate_distance(p1, p2):
-    """
-    Принимает координаты двух точек на плоскости и возвращает расстояние между ними
-    :type p1: (int, int)
-    :type p2: (int, int)
-    :rtype: float
-    """
-    return ((p2[0] - p1[0]) ** 2 + (p2[1] - p1[1]) ** 2) ** 0.5
-
-
-def create_distance_dict(points):
-    """
-    Принимает словарь с координатами точек и возвращает словарь расстояний между ними
-    :type points: dict
-    :rtype: dict
-    """
-    dist_dict = {}
-    for i in range(len(points)-1):
-        for j in range(i+1, len(points)):
-            dist_dict[(i, j)] = dist_dict[(j, i)] = calculate_distance(points[i], points[j])
-    return dist_dict
+from bound import calculate_lower_bound, format_gap_string
+from distance import create_distance_matrix
+from stats import SearchStats, measure_phase
 
 
 def find_min_row(matr, ind=-1):
@@ -56,34 +35,57 @@ def format_result_string(lst):
     return result_str
 
 
-def main(data):
-    # Словарь координат точек:
-    points = {x: y for x, y in enumerate(list(data.keys()))}
-
-    # Словарь расстояний между всеми точками, чтобы в дальнейшем не считать расстояние каждый раз заново
-    # своего рода мемоизация:)
-    dist_dict = create_distance_dict(points)
-
+def find_min_combination(matrix, n):
+    """
+    Перебирает все маршруты, начинающиеся с точки 0, и возвращает список из кортежа
+    самого короткого маршрута, расстояний между точками и суммы маршрута
+    :param matrix: матрица расстояний (список списков)
+    :type n: int
+    :rtype: list
+    """
     # Список всех возможных комбинаций маршрута между точками:
-    base = range(len(points))
+    base = range(n)
     comb = permutations(base)
     possible_lst = list(filter(lambda x: x[0] == 0, comb))
 
-    matrix = []
+    rows = []
     for el in possible_lst:
         row = [el]
         last_ind = int(el[-1])
         for i in range(len(el)-1):
-            dist = dist_dict[(el[i], el[i+1])]
+            dist = matrix[el[i]][el[i+1]]
             row.append(dist)
-        dist = dist_dict[(0, last_ind)]
+        dist = matrix[0][last_ind]
         row.append(dist)
         sum_dist = sum(row[1:])
         row.append(sum_dist)
-        matrix.append(row)
-    result_lst = find_min_row(matrix)
-    result = format_result_string(result_lst)
+        rows.append(row)
+    return find_min_row(rows)
+
+
+def main(data, stats=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
+
+    # Матрица расстояний между всеми точками, чтобы в дальнейшем не считать расстояние каждый раз заново
+    # своего рода мемоизация:) Список списков быстрее индексируется в цикле, чем массив NumPy.
+    with measure_phase(stats, 'matrix'):
+        matrix = create_distance_matrix(points).tolist()
+
+    with measure_phase(stats, 'search'):
+        result_lst = find_min_combination(matrix, len(points))
+    stats.add('permutations', math.factorial(max(len(points) - 1, 0)))
+    stats.record_bound(result_lst[-1])
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(create_distance_matrix(points), upper_bound=result_lst[-1])
+    with measure_phase(stats, 'format'):
+        result = format_result_string(result_lst)
     print(result)
+    print(format_gap_string(result_lst[-1], bound))
+    return result_lst, stats
 
 
 if __name__ == '__main__':
@@ -96,8 +98,4 @@ if __name__ == '__main__':
         (8, 3): 'Вечнозелёная Аллея',
     }
 
-    # start_time = timeit.default_timer()
     main(DATA)
-    # print(timeit.default_timer() - start_time)
-    # print(timeit.timeit("main(DATA)", setup="from __main__ import main, DATA", number=1))
-    # cProfile.run('main(DATA)')
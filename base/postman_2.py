@@ -3,35 +3,25 @@
 из-за нехватки памяти, потому что сохранялись все промежуточные данные.
 В этом варианте высвобождается память. Вместо перебора по списку возможных маршрутов перебор по итератору.
 Текущие расчетные данные тоже не сохраняются, а перезаписываются.
-Но очень медленно - 13 точек расчитывались 1 час."""
+Но очень медленно - 13 точек расчитывались 1 час.
+Функция find_min_combination_parallel - тот же точный перебор на нескольких ядрах:
+перебираются только маршруты, начинающиеся с точки 0, поиск делится по префиксам маршрута
+между процессами пула, а найденный рекорд публикуется в общей памяти, чтобы остальные процессы
+отбрасывали префиксы и продолжения, которые заведомо длиннее.
+Функция find_min_combination_incremental - однопоточный перебор без выделения памяти на каждую
+перестановку: перестановки обходятся в порядке соседних транспозиций (Штейнгауз-Джонсон-Троттер,
+алгоритм P Кнута), поэтому длина маршрута на каждом шаге пересчитывается за O(1) по двум
+изменившимся дугам, а зеркальные маршруты (обход в обратную сторону) не сравниваются."""
 
 
 from itertools import permutations
-import timeit
-import cProfile
+import math
+from multiprocessing import Pool, Value
+import os
 
-
-def calculate_distance(p1, p2):
-    """
-    Принимает координаты двух точек на плоскости и возвращает расстояние между ними
-    :type p1: (int, int)
-    :type p2: (int, int)
-    :rtype: float
-    """
-    return ((p2[0] - p1[0]) ** 2 + (p2[1] - p1[1]) ** 2) ** 0.5
-
-
-def create_distance_dict(points):
-    """
-    Принимает словарь с координатами точек и возвращает словарь расстояний между ними
-    :type points: dict
-    :rtype: dict
-    """
-    dist_dict = {}
-    for i in range(len(points)-1):
-        for j in range(i+1, len(points)):
-            dist_dict[(i, j)] = dist_dict[(j, i)] = calculate_distance(points[i], points[j])
-    return dist_dict
+from bound import calculate_lower_bound, format_gap_string
+from distance import create_distance_matrix
+from stats import SearchStats, measure_phase
 
 
 def format_result_string(lst):
@@ -49,13 +39,13 @@ def format_result_string(lst):
     return result_str
 
 
-def find_min_combination(dist_dict, n):
+def find_min_combination(dist_matrix, n):
     """
-    Принимает словарь расстояний между точками (включая маршрут туда и обратно:
-    {(0,2): 123, (2,0): 123}) и количество всех точек.
+    Принимает матрицу расстояний между точками (список списков или массив: dist_matrix[i][j])
+    и количество всех точек.
     Возвращает список из кортежа с комбинацией самого короткого маршрута, соответствующих расстояний
     между точками и суммой маршрута.
-    :type dist_dict: dict
+    :type dist_matrix: list
     :type n: int
     :rtype: list
     """
@@ -66,9 +56,9 @@ def find_min_combination(dist_dict, n):
         row = [el]
         last_ind = int(el[-1])
         for i in range(len(el) - 1):
-            dist = dist_dict[(el[i], el[i + 1])]
+            dist = dist_matrix[el[i]][el[i + 1]]
             row.append(dist)
-        dist = dist_dict[(0, last_ind)]
+        dist = dist_matrix[0][last_ind]
         row.append(dist)
         sum_dist = sum(row[1:])
         if sum_dist < MIN_DIST:
@@ -78,17 +68,231 @@ def find_min_combination(dist_dict, n):
     return matrix
 
 
-def main(data):
+def find_min_combination_incremental(dist_matrix, n, stats=None):
+    """
+    Полный перебор маршрутов, начинающихся с точки 0, в порядке соседних транспозиций.
+    При перестановке соседних точек t[p] и t[p + 1] меняются только дуги (t[p - 1], t[p])
+    и (t[p + 1], t[p + 2]), поэтому длина обновляется за O(1). Чтобы не накапливать ошибку
+    округления, длина пересчитывается полностью каждый раз, когда сдвигается не последний
+    элемент (раз в n - 1 шагов). Из пары зеркальных маршрутов сравнивается только тот,
+    у которого t[1] < t[n - 1].
+    Возвращает результат в том же виде, что и find_min_combination.
+    :param dist_matrix: симметричная матрица расстояний (список списков)
+    :type n: int
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :rtype: list
+    """
+    t = list(range(n))
+    m = n - 1
+    if m < 2:
+        return create_result_row(dist_matrix, t)
+    d = dist_matrix
+    cost = sum(d[t[i]][t[(i + 1) % n]] for i in range(n))
+    best_cost = cost
+    best_route = tuple(t)
+    # Счетчики и направления движения элементов (индексы 1..m):
+    c = [0] * (m + 1)
+    o = [1] * (m + 1)
+    while True:
+        j = m
+        s = 0
+        while True:
+            q = c[j] + o[j]
+            if q == j:
+                if j == 1:
+                    if stats is not None:
+                        # Перебираются все (n - 1)! перестановок точек 1..n-1:
+                        stats.add('permutations', math.factorial(m))
+                    return create_result_row(dist_matrix, best_route)
+                s += 1
+            if q < 0 or q == j:
+                o[j] = -o[j]
+                j -= 1
+                continue
+            break
+        p = min(j - c[j] + s, j - q + s)
+        c[j] = q
+        u = t[p]
+        v = t[p + 1]
+        prev = t[p - 1]
+        nxt = t[(p + 2) % n]
+        t[p] = v
+        t[p + 1] = u
+        if j == m:
+            cost += d[prev][v] + d[u][nxt] - d[prev][u] - d[v][nxt]
+        else:
+            cost = sum(d[t[i]][t[(i + 1) % n]] for i in range(n))
+        if cost < best_cost and t[1] < t[m]:
+            best_cost = cost
+            best_route = tuple(t)
+            if stats is not None:
+                stats.record_bound(cost)
+
+
+# Состояние процесса пула: матрица расстояний и общий рекорд (заполняется в init_worker)
+WORKER_STATE = {}
+
+# Через сколько полных маршрутов процесс пула сверяет свой рекорд с общим:
+SYNC_INTERVAL = 4096
+
+
+def create_result_row(dist_matrix, route):
+    """
+    Возвращает список из кортежа маршрута, расстояний между соседними точками и суммы маршрута -
+    в том же виде, что и find_min_combination
+    :type dist_matrix: list
+    :type route: tuple
+    :rtype: list
+    """
+    row = [tuple(route)]
+    for i in range(len(route)):
+        row.append(dist_matrix[route[i]][route[(i + 1) % len(route)]])
+    row.append(sum(row[1:]))
+    return row
+
+
+def init_worker(dist_matrix, best):
+    """
+    Инициализирует процесс пула: сохраняет матрицу расстояний и общий рекорд
+    :type dist_matrix: list
+    :type best: multiprocessing.Value
+    :return: None
+    """
+    WORKER_STATE['matrix'] = dist_matrix
+    WORKER_STATE['best'] = best
+
+
+def publish_best(best, length):
+    """
+    Записывает длину маршрута в общий рекорд, если она меньше текущего значения.
+    Возвращает актуальный общий рекорд.
+    :type best: multiprocessing.Value
+    :type length: float
+    :rtype: float
+    """
+    with best.get_lock():
+        if length < best.value:
+            best.value = length
+        return best.value
+
+
+def search_prefix(prefix):
+    """
+    Перебирает все маршруты с заданным началом (prefix[0] == 0) в глубину, отсекая продолжения,
+    длина которых уже не меньше рекорда. Выполняется в процессе пула.
+    Возвращает кортеж (длина, маршрут) лучшего найденного маршрута (или None) и счетчики
+    (раскрытые узлы, отсеченные узлы, полные маршруты) для статистики.
+    :type prefix: tuple
+    :rtype: (tuple or None, tuple)
+    """
+    matrix = WORKER_STATE['matrix']
+    best = WORKER_STATE['best']
+    n = len(matrix)
+    cost = sum(matrix[prefix[i]][prefix[i + 1]] for i in range(len(prefix) - 1))
+    state = {'bound': best.value, 'route': None, 'length': None, 'leaves': 0, 'expanded': 0, 'pruned': 0}
+    if cost >= state['bound']:
+        return None, (0, 1, 0)
+    route = list(prefix)
+    rest = [x for x in range(n) if x not in prefix]
+
+    def extend(last, cost):
+        if not rest:
+            length = cost + matrix[last][0]
+            state['leaves'] += 1
+            if length < state['bound']:
+                state['route'], state['length'] = tuple(route), length
+                state['bound'] = publish_best(best, length)
+            elif state['leaves'] % SYNC_INTERVAL == 0:
+                state['bound'] = min(state['bound'], best.value)
+            return
+        state['expanded'] += 1
+        for k in range(len(rest)):
+            city = rest[k]
+            new_cost = cost + matrix[last][city]
+            if new_cost >= state['bound']:
+                state['pruned'] += 1
+                continue
+            rest[k] = rest[-1]
+            rest.pop()
+            route.append(city)
+            extend(city, new_cost)
+            route.pop()
+            rest.append(city)
+            rest[k], rest[-1] = rest[-1], rest[k]
+
+    extend(route[-1], cost)
+    counts = (state['expanded'], state['pruned'], state['leaves'])
+    if state['route'] is None:
+        return None, counts
+    return (state['length'], state['route']), counts
+
+
+def find_min_combination_parallel(dist_matrix, n, processes=None, prefix_len=3, stats=None):
+    """
+    Точный перебор маршрутов на пуле процессов. Маршруты фиксированы в точке 0,
+    задания - все префиксы длины prefix_len (включая точку 0), отсортированные по длине,
+    чтобы хорошие рекорды находились раньше.
+    Счетчики процессов пула суммируются в основном процессе по мере получения результатов.
+    Возвращает результат в том же виде, что и find_min_combination.
+    :type dist_matrix: list
+    :type n: int
+    :param processes: количество процессов (по умолчанию - количество ядер)
+    :param prefix_len: длина префикса, по которому делится перебор
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :rtype: list
+    """
+    if n <= prefix_len:
+        result = find_min_combination(dist_matrix, n)
+        if stats is not None:
+            stats.add('permutations', math.factorial(max(n - 1, 0)))
+            stats.record_bound(result[-1])
+        return result
+    prefixes = [(0,) + p for p in permutations(range(1, n), prefix_len - 1)]
+    prefixes.sort(key=lambda p: sum(dist_matrix[p[i]][p[i + 1]] for i in range(len(p) - 1)))
+    best = Value('d', float('inf'))
+    results = []
+    totals = [0, 0, 0]
+    recorded = float('inf')
+    with Pool(processes or os.cpu_count(), initializer=init_worker, initargs=(dist_matrix, best)) as pool:
+        for res, counts in pool.imap_unordered(search_prefix, prefixes):
+            totals = [total + count for total, count in zip(totals, counts)]
+            if res is not None:
+                if stats is not None and res[0] < recorded:
+                    recorded = res[0]
+                    stats.record_bound(recorded)
+                results.append(res)
+    if stats is not None:
+        stats.add('nodes_expanded', totals[0])
+        stats.add('nodes_pruned', totals[1])
+        stats.add('routes_evaluated', totals[2])
+    length, route = min(results)
+    return create_result_row(dist_matrix, route)
+
+
+def main(data, processes=1, stats=None):
     # Словарь координат точек:
     points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
 
-    # Словарь расстояний между всеми точками, чтобы в дальнейшем не считать расстояние каждый раз заново
-    dist_dict = create_distance_dict(points)
+    # Матрица расстояний между всеми точками, чтобы в дальнейшем не считать расстояние каждый раз заново
+    with measure_phase(stats, 'matrix'):
+        dist_matrix = create_distance_matrix(points).tolist()
 
-    matrix = find_min_combination(dist_dict, n=len(points))
+    with measure_phase(stats, 'search'):
+        if processes == 1:
+            matrix = find_min_combination_incremental(dist_matrix, n=len(points), stats=stats)
+        else:
+            matrix = find_min_combination_parallel(dist_matrix, n=len(points), processes=processes, stats=stats)
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(create_distance_matrix(points), upper_bound=matrix[-1])
 
-    result = format_result_string(matrix)
+    with measure_phase(stats, 'format'):
+        result = format_result_string(matrix)
     print(result)
+    print(format_gap_string(matrix[-1], bound))
+    return matrix, stats
 
 
 if __name__ == '__main__':
@@ -102,5 +306,3 @@ if __name__ == '__main__':
     }
 
     main(DATA)
-    # print(timeit.timeit("main(DATA)", setup="from __main__ import main, DATA", number=1))
-    # cProfile.run('main(DATA)')
@@ -1,119 +1,316 @@
 """Решение методом Литтла.
-Математику давно забыл, поэтому решение вышло корявое"""
+Математику давно забыл, поэтому решение вышло корявое.
+Функция find_min_distance - жадный вариант: на каждом шаге фиксирует дугу с максимальным
+штрафом и никогда не возвращается назад, поэтому оптимальность не гарантирует.
+Функция find_optimal_route - полноценный метод ветвей и границ: дерево решений с ветвлением
+"включить дугу"/"исключить дугу", обходом в глубину по нижним оценкам, запретом подциклов
+и отсечением по рекорду, который задается заранее или получается эвристикой ближайшего соседа
+с локальным поиском. Для симметричной матрицы оценка узла усиливается 1-деревом Хелда-Карпа."""
 
 
 import numpy as np
-import timeit
 
+from bound import (calculate_fixed_one_tree, calculate_lower_bound, find_nearest_neighbour_route, find_penalties,
+                   format_gap_string, sort_tree_edges)
+from distance import create_distance_matrix, create_matrix_distance
+from local_search import optimize_route
+from stats import SearchStats, measure_phase
+from tour import route_to_edges
 
-def calculate_distance(p1, p2):
-    """
-    Принимает координаты двух точек на плоскости и возвращает расстояние между ними
-    :type p1: (int, int)
-    :type p2: (int, int)
-    :rtype: float
-    """
-    return ((p2[0] - p1[0]) ** 2 + (p2[1] - p1[1]) ** 2) ** 0.5
 
-
-def get_min_row(m, el):
-    """
-    Принимает двумерную матрицу и координаты ячейки. Возвращает минимальное значение
-    из всех соседних ячеек в ряду.
-    :param m: двумерная матрица
-    :param el: список координат точки
-    :rtype: float or int
-    """
-    return min(x for ind, x in enumerate(m[el[0]]) if ind != el[1])
+# Количество ближайших соседей в списках кандидатов локального поиска для начального рекорда:
+SEED_NEIGHBOURS = 10
 
 
-def get_min_column(m, el):
+def get_second_minima(matrix, axis):
     """
-    Принимает двумерную матрицу и координаты ячейки. Возвращает минимальное значение
-    из всех соседних ячеек в столбце.
-    :param m: двумерная матрица
-    :param el: список координат точки
-    :rtype: float or int
+    Возвращает второе по величине минимальное значение в каждой строке (axis=1)
+    или в каждом столбце (axis=0) матрицы. Для нулевой клетки приведенной матрицы
+    это минимум из всех соседних ячеек ряда.
+    :param matrix: двумерная матрица
+    :type axis: int
+    :rtype: numpy.ndarray
     """
-    return min(x for ind, x in enumerate(m[:, el[1]]) if ind != el[0])
+    return np.partition(matrix, 1, axis=axis).take(1, axis=axis)
 
 
 def subtract_min_from_rows(matrix):
     """
     Вычисляет минимальное значение в каждой строке двумерной матрицы
-    и вычитает это значение из строки
+    и вычитает это значение из строки. Строки, целиком состоящие из np.inf, не изменяются.
     :param matrix: двумерная матрица
-    :return: None
+    :return: сумма вычтенных минимумов (np.inf, если есть строка без допустимых дуг)
+    :rtype: float
     """
-    for i in range(len(matrix)):
-        minimum = min(matrix[i])
-        matrix[i] -= minimum
+    minima = matrix.min(axis=1)
+    finite = np.isfinite(minima)
+    matrix[finite] -= minima[finite, np.newaxis]
+    return minima.sum()
 
 
 def subtract_min_from_columns(matrix):
     """
     Вычисляет минимальное значение в каждом столбце двумерной матрицы
-    и вычитает это значение из столбца
+    и вычитает это значение из столбца. Столбцы, целиком состоящие из np.inf, не изменяются.
+    :param matrix: двумерная матрица
+    :return: сумма вычтенных минимумов (np.inf, если есть столбец без допустимых дуг)
+    :rtype: float
+    """
+    minima = matrix.min(axis=0)
+    finite = np.isfinite(minima)
+    matrix[:, finite] -= minima[finite]
+    return minima.sum()
+
+
+def reduce_matrix(matrix):
+    """
+    Приводит матрицу по строкам и столбцам и возвращает константу приведения -
+    приращение нижней оценки длины маршрута
     :param matrix: двумерная матрица
-    :return: None
+    :rtype: float
     """
-    for i in range(len(matrix)):
-        minimum = min(matrix[:, i])
-        matrix[:, i] -= minimum
+    return subtract_min_from_rows(matrix) + subtract_min_from_columns(matrix)
 
 
 def find_max_weight_element(matrix, lst):
     """
-    Принимает матрицу и список нулевых элементов (координаты).
-    Возвращает координаты ячейки с максимальным весом
+    Принимает матрицу и массив нулевых элементов (координаты).
+    Возвращает координаты ячейки с максимальным весом. Вес нулевой клетки - сумма минимумов
+    соседних ячеек ее строки и столбца, то есть вторых минимумов строки и столбца.
     :param matrix: двумерная матрица
-    :param lst: список нулевых элементов
+    :param lst: массив нулевых элементов, как его возвращает np.argwhere
     :rtype: tuple
     """
-    max_zero = 0
-    max_x = 0
-    max_y = 0
-    for el in lst:
-        min_sum = get_min_row(matrix, el) + get_min_column(matrix, el)
-        if min_sum > max_zero:
-            max_zero = min_sum
-            max_x = el[0]
-            max_y = el[1]
-    return max_x, max_y
+    if len(lst) == 0:
+        return 0, 0
+    weights = get_second_minima(matrix, 1)[lst[:, 0]] + get_second_minima(matrix, 0)[lst[:, 1]]
+    ind = int(np.argmax(weights))
+    return int(lst[ind][0]), int(lst[ind][1])
 
 
-def find_min_distance(matrix, row, col, result=[]):
+def find_min_distance(matrix, row, col, result=None):
     """
-    Принимает двумерную матрицу и списки точек обхода. Рекурсивно возвращает список элементов,
+    Принимает двумерную матрицу и списки точек обхода. Возвращает список элементов,
     соответствующих минимальным дугам обхода.
+    Матрица изменяется на месте: вместо удаления строк и столбцов использованные ряды
+    заполняются np.inf, поэтому на каждом шаге не создается ни одной копии матрицы.
     :type matrix: numpy.ndarray
     :type row: list
     :type col: list
     :type result: list
     :rtype: list
     """
-    if len(matrix) < 2:
-        result.append((row[0], col[0]))
-        return result
-    # Вычитаем из строк минимальные значения:
-    subtract_min_from_rows(matrix)
-    # Вычитаем из столбцов минимальные значения:
-    subtract_min_from_columns(matrix)
-    # Получаем индексы нулевых элементов:
-    ind_zero = np.argwhere(matrix == 0)
-    # Находим нулевую клетку с максимальной оценкой:
-    max_x, max_y = find_max_weight_element(matrix, ind_zero)
-    # Добавляем путь:
-    result.append((row[max_x], col[max_y]))
-    # Расставляем запреты:
-    matrix[max_y][max_x] = np.inf
-    # Удаляем строку и столбец:
-    matrix = np.delete(matrix, max_x, axis=0)
-    matrix = np.delete(matrix, max_y, axis=1)
-    # Удаляем использованные точки:
-    del row[max_x]
-    del col[max_y]
-    return find_min_distance(matrix, row, col)
+    if result is None:
+        result = []
+    free_rows = np.ones(len(row), dtype=bool)
+    free_cols = np.ones(len(col), dtype=bool)
+    for _ in range(len(row) - 1):
+        # Вычитаем из строк и столбцов минимальные значения:
+        reduce_matrix(matrix)
+        # Получаем индексы нулевых элементов:
+        ind_zero = np.argwhere(matrix == 0)
+        # Находим нулевую клетку с максимальной оценкой:
+        max_x, max_y = find_max_weight_element(matrix, ind_zero)
+        # Добавляем путь:
+        i, j = row[max_x], col[max_y]
+        start, end = find_chain_ends(result, i, j)
+        result.append((i, j))
+        # Исключаем строку и столбец:
+        matrix[max_x, :] = np.inf
+        matrix[:, max_y] = np.inf
+        free_rows[max_x] = False
+        free_cols[max_y] = False
+        # Запрещаем дугу, замыкающую подцикл:
+        if end in row and start in col:
+            matrix[row.index(end), col.index(start)] = np.inf
+    result.append((row[int(np.argmax(free_rows))], col[int(np.argmax(free_cols))]))
+    return result
+
+
+def shrink_matrix(matrix, x, y):
+    """
+    Возвращает матрицу без строки x и столбца y. Выборка делается одним обращением
+    по индексам, а не двумя последовательными np.delete.
+    :type matrix: numpy.ndarray
+    :type x: int
+    :type y: int
+    :rtype: numpy.ndarray
+    """
+    rows = np.delete(np.arange(matrix.shape[0]), x)
+    cols = np.delete(np.arange(matrix.shape[1]), y)
+    return matrix[np.ix_(rows, cols)]
+
+
+def find_chain_ends(edges, i, j):
+    """
+    Принимает список уже включенных дуг и новую дугу (i, j). Возвращает начало цепочки,
+    заканчивающейся в i, и конец цепочки, начинающейся в j. Дуга из конца в начало
+    замкнула бы подцикл и должна быть запрещена.
+    :type edges: tuple
+    :type i: int
+    :type j: int
+    :rtype: (int, int)
+    """
+    succ = dict(edges)
+    pred = {b: a for a, b in edges}
+    start = i
+    while start in pred:
+        start = pred[start]
+    end = j
+    while end in succ:
+        end = succ[end]
+    return start, end
+
+
+def complete_route(matrix, edges, row, col):
+    """
+    Достраивает маршрут по оставшейся матрице 2x2. Возвращает список дуг и длину маршрута
+    или (None, np.inf), если замкнуть маршрут без подциклов нельзя.
+    :param matrix: исходная матрица расстояний
+    :type edges: tuple
+    :type row: list
+    :type col: list
+    :rtype: (list, float)
+    """
+    n = len(matrix)
+    for pair in (((row[0], col[0]), (row[1], col[1])), ((row[0], col[1]), (row[1], col[0]))):
+        route = list(edges) + list(pair)
+        succ = dict(route)
+        # Маршрут должен вернуться в точку 0 ровно через n шагов:
+        current = succ[0]
+        steps = 1
+        while current != 0 and steps < n:
+            current = succ[current]
+            steps += 1
+        if current != 0 or steps != n:
+            continue
+        length = sum(matrix[a][b] for a, b in route)
+        if length != np.inf:
+            return route, length
+    return None, np.inf
+
+
+def find_optimal_route(matrix, upper_bound=None, route=None, stats=None):
+    """
+    Находит оптимальный маршрут методом ветвей и границ (метод Литтла).
+    Узлы дерева - приведенные матрицы со списками точек строк и столбцов и уже включенными дугами.
+    Начальный рекорд известен заранее (upper_bound или маршрут ближайшего соседа, для симметричной
+    матрицы улучшенный локальным поиском), поэтому дерево обходится в глубину: из двух потомков
+    первым раскрывается потомок с меньшей оценкой.
+    В стеке лежит не больше одного отложенного потомка на уровень, и память ограничена
+    глубиной дерева, а не количеством открытых узлов, как при обходе по очереди с приоритетом.
+    Для симметричной матрицы оценка узла - наибольшая из константы приведения и веса
+    1-дерева со штрафами Хелда-Карпа (модуль bound), содержащего включенные дуги:
+    приведение матрицы оценивает маршрут намного слабее, и без 1-дерева уже 30 точек
+    не решаются за разумное время. Узлы с оценкой не меньше рекорда отсекаются.
+    :param matrix: матрица расстояний (не изменяется)
+    :param upper_bound: длина известного маршрута - начальный рекорд
+    :param route: список дуг известного маршрута длины upper_bound; если upper_bound задан
+        без route и маршрута короче upper_bound нет, возвращается None
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :return: список дуг оптимального маршрута (или None)
+    :rtype: list
+    """
+    n = len(matrix)
+    if n < 2:
+        return []
+    root = np.array(matrix, dtype=float)
+    # 1-дерево и локальный поиск применимы только к симметричной матрице с конечными расстояниями:
+    off_diagonal = ~np.eye(n, dtype=bool)
+    symmetric = n > 3 and np.isfinite(root[off_diagonal]).all() and (root == root.T)[off_diagonal].all()
+    if upper_bound is None:
+        route, upper_bound = find_nearest_neighbour_route(matrix)
+        if symmetric:
+            # Маршрут ближайшего соседа улучшается 2-opt и Or-opt: с хорошим рекордом
+            # дерево поиска на порядки меньше:
+            nearest = [[x for x in row if x != i][:SEED_NEIGHBOURS]
+                       for i, row in enumerate(np.argsort(root, axis=1).tolist())]
+            route = route_to_edges(optimize_route([i for i, _ in route], create_matrix_distance(root), nearest))
+            upper_bound = sum(root[i, j] for i, j in route)
+    best_route, best_length = route, upper_bound
+    if stats is not None:
+        stats.record_bound(best_length)
+
+    tree = None
+    if symmetric:
+        pi = find_penalties(root, upper_bound)[1]
+        weights = root + pi[:, np.newaxis] + pi[np.newaxis, :]
+        tree = (weights.tolist(), sort_tree_edges(weights), 2 * float(pi.sum()))
+
+    def get_tree_bound(m, row, col, edges):
+        if tree is None:
+            return -np.inf
+        # Ребро допустимо, если не запрещена хотя бы одна из двух дуг:
+        allowed = np.zeros((n, n), dtype=bool)
+        allowed[np.ix_(row, col)] = np.isfinite(m)
+        allowed |= allowed.T
+        return calculate_fixed_one_tree(tree[0], tree[1], edges, allowed.tolist()) - tree[2]
+
+    reduced = reduce_matrix(root)
+    bound = max(reduced, get_tree_bound(root, list(range(n)), list(range(n)), ()))
+    if stats is not None:
+        stats.record_bound(bound, 'lower')
+    stack = [(bound, reduced, root, list(range(n)), list(range(n)), ())]
+    expanded = pruned = 0
+    while stack:
+        bound, reduced, m, row, col, edges = stack.pop()
+        if bound >= best_length:
+            pruned += 1
+            continue
+        expanded += 1
+        if len(m) == 2:
+            candidate, length = complete_route(matrix, edges, row, col)
+            if length < best_length:
+                best_route, best_length = candidate, length
+                if stats is not None:
+                    stats.record_bound(length)
+            continue
+        ind_zero = np.argwhere(m == 0)
+        max_x, max_y = find_max_weight_element(m, ind_zero)
+        i, j = row[max_x], col[max_y]
+
+        # Ветвь "дуга (i, j) не входит в маршрут":
+        m_out = m.copy()
+        m_out[max_x][max_y] = np.inf
+        reduced_out = reduced + reduce_matrix(m_out)
+        bound_out = max(bound, reduced_out)
+        if bound_out < best_length:
+            bound_out = max(bound_out, get_tree_bound(m_out, row, col, edges))
+
+        # Ветвь "дуга (i, j) входит в маршрут":
+        m_in = shrink_matrix(m, max_x, max_y)
+        row_in = row[:max_x] + row[max_x + 1:]
+        col_in = col[:max_y] + col[max_y + 1:]
+        start, end = find_chain_ends(edges, i, j)
+        if end in row_in and start in col_in:
+            m_in[row_in.index(end)][col_in.index(start)] = np.inf
+        if symmetric:
+            # Каждый маршрут симметричной задачи встречается в обоих направлениях; оставляем то,
+            # в котором следующая за 0 точка меньше предыдущей:
+            if i == 0 and 0 in col_in:
+                m_in[[x < j for x in row_in], col_in.index(0)] = np.inf
+            elif j == 0 and 0 in row_in:
+                m_in[row_in.index(0), [x > i for x in col_in]] = np.inf
+        edges_in = edges + ((i, j),)
+        reduced_in = reduced + reduce_matrix(m_in)
+        bound_in = max(bound, reduced_in)
+        if bound_in < best_length:
+            bound_in = max(bound_in, get_tree_bound(m_in, row_in, col_in, edges_in))
+
+        children = [(bound_out, reduced_out, m_out, row, col, edges),
+                    (bound_in, reduced_in, m_in, row_in, col_in, edges_in)]
+        # Потомок с меньшей оценкой кладется в стек последним и раскрывается первым:
+        if bound_in > bound_out:
+            children.reverse()
+        for child in children:
+            if child[0] < best_length:
+                stack.append(child)
+            else:
+                pruned += 1
+    if stats is not None:
+        stats.add('nodes_expanded', expanded)
+        stats.add('nodes_pruned', pruned)
+    return None if best_route is None else list(best_route)
 
 
 def sort_list_by_tuples(lst):
@@ -169,37 +366,38 @@ def format_result_string(lst_1, lst_2):
 def create_matrix(points, n):
     """
     Принимает словарь точек с координатами и возвращает двумерную матрицу размерностью nxn
+    с np.inf на главной диагонали
     :type points: dict
     :type n: int
     :rtype: numpy.ndarray
     """
-    m = np.zeros((n, n))
-    m[np.diag_indices_from(m)] = np.inf
-    for i in range(n-1):
-        for j in range(i+1, n):
-            m[i][j] = calculate_distance(points[i], points[j])
-    matrix = m + m.transpose()
-    return matrix
+    return create_distance_matrix({i: points[i] for i in range(n)}, diagonal=np.inf)
 
 
-def main(data):
+def main(data, stats=None):
     # Словарь координат точек:
     points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
     # Формирование рабочей матрицы:
     n = len(points)
-    matrix = create_matrix(points, n)
-    # Неизменяемая копия матрицы:
-    start_matrix = matrix.copy()
-    # Списки точек маршрута:
-    row = list(range(n))
-    col = list(range(n))
-    # Список минимальных дуг обхода:
-    result = find_min_distance(matrix, row, col)
-    result_lst = sort_list_by_tuples(result)
-    # Список соответсвующмх расстояний:
-    dist_lst = fill_distance_list(start_matrix, result_lst)
-    result_str = format_result_string(result_lst, dist_lst)
+    with measure_phase(stats, 'matrix'):
+        matrix = create_matrix(points, n)
+    # Список дуг оптимального маршрута:
+    with measure_phase(stats, 'search'):
+        result = find_optimal_route(matrix, stats=stats)
+    with measure_phase(stats, 'format'):
+        result_lst = sort_list_by_tuples(result)
+        # Список соответсвующмх расстояний:
+        dist_lst = fill_distance_list(matrix, result_lst)
+        result_str = format_result_string(result_lst, dist_lst)
+    # Матрица create_matrix содержит inf на диагонали, для оценки нужна обычная матрица расстояний:
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(create_distance_matrix(points), upper_bound=sum(dist_lst))
     print(result_str)
+    print(format_gap_string(sum(dist_lst), bound))
+    return result_lst, stats
 
 
 if __name__ == '__main__':
@@ -212,6 +410,4 @@ if __name__ == '__main__':
         (8, 3): 'Вечнозелёная Аллея',
     }
 
-    # start_time = timeit.default_timer()
     main(DATA)
-    # print(timeit.default_timer() - start_time)
@@ -0,0 +1,146 @@
+"""Точное решение задачи "коммивояжера" методом динамического программирования
+по подмножествам (алгоритм Хелда-Карпа).
+Сложность O(n^2 * 2^n) вместо O(n!) у полного перебора, поэтому 20-23 точки
+считаются за секунды. Таблицы ДП хранятся в массивах NumPy и заполняются послойно:
+все подмножества с одинаковым количеством точек обрабатываются одной векторной операцией.
+Память: таблица стоимостей занимает 2^(n-1) * (n-1) элементов dtype (для 23 точек
+в float64 около 740 Мб, в float32 - вдвое меньше), таблица предков - столько же байт."""
+
+
+import numpy as np
+
+from bound import calculate_lower_bound, format_gap_string
+from distance import create_distance_matrix
+from postman_2 import format_result_string
+from stats import SearchStats, measure_phase
+
+
+def count_bits(masks, m):
+    """
+    Возвращает количество единичных битов в каждой маске массива
+    :type masks: numpy.ndarray
+    :type m: int
+    :rtype: numpy.ndarray
+    """
+    counts = np.zeros(len(masks), dtype=np.int8)
+    for b in range(m):
+        counts += ((masks >> b) & 1).astype(np.int8)
+    return counts
+
+
+def solve_held_karp(matrix, dtype=np.float64, stats=None):
+    """
+    Принимает матрицу расстояний и возвращает кортеж из оптимального маршрута (начиная с точки 0)
+    и его длины. Точка 0 - стартовая, остальные точки 1..n-1 кодируются битами 0..n-2 маски.
+    dp[mask, j] - длина кратчайшего пути из точки 0 через все точки mask с окончанием в точке j+1.
+    :type matrix: numpy.ndarray
+    :param dtype: тип элементов таблицы стоимостей (float32 экономит память на 22-23 точках)
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :rtype: (tuple, float)
+    """
+    n = len(matrix)
+    if n < 2:
+        return tuple(range(n)), 0.0
+    m = n - 1
+    size = 1 << m
+    d = np.asarray(matrix, dtype=dtype)
+    # Расстояния между промежуточными точками и от/до стартовой:
+    inner = d[1:, 1:]
+    from_start = d[0, 1:]
+    to_start = d[1:, 0]
+
+    dp = np.full((size, m), np.inf, dtype=dtype)
+    parent = np.full((size, m), -1, dtype=np.int8)
+    single = 1 << np.arange(m)
+    dp[single, np.arange(m)] = from_start
+
+    # Группируем маски по количеству точек, чтобы заполнять таблицу послойно:
+    masks = np.arange(size, dtype=np.int64)
+    counts = count_bits(masks, m)
+    order = np.argsort(counts, kind='stable')
+    bounds = np.searchsorted(counts[order], np.arange(m + 2))
+
+    for s in range(2, m + 1):
+        layer = order[bounds[s]:bounds[s + 1]]
+        for j in range(m):
+            sel = layer[(layer >> j) & 1 == 1]
+            prev = sel ^ (1 << j)
+            # Кандидаты: путь до prev с окончанием в k плюс дуга k -> j:
+            cand = dp[prev] + inner[:, j]
+            best = np.argmin(cand, axis=1)
+            dp[sel, j] = cand[np.arange(len(sel)), best]
+            parent[sel, j] = best
+
+    full = size - 1
+    total = dp[full] + to_start
+    last = int(np.argmin(total))
+    length = float(total[last])
+
+    # Восстанавливаем маршрут с конца по таблице предков:
+    route = []
+    mask = full
+    j = last
+    while j >= 0:
+        route.append(j + 1)
+        prev_j = int(parent[mask, j])
+        mask ^= 1 << j
+        j = prev_j
+    route.append(0)
+    route.reverse()
+    if stats is not None:
+        # Состояния (маска, последняя точка) и переходы между ними:
+        stats.add('states', size * m)
+        stats.add('transitions', size * m * m)
+        stats.record_bound(length)
+    return tuple(route), length
+
+
+def create_result_list(matrix, route, length):
+    """
+    Возвращает список из кортежа маршрута, расстояний между соседними точками и суммы маршрута
+    в формате функции format_result_string
+    :type matrix: numpy.ndarray
+    :type route: tuple
+    :type length: float
+    :rtype: list
+    """
+    row = [route]
+    for i in range(len(route)):
+        row.append(float(matrix[route[i]][route[(i + 1) % len(route)]]))
+    row.append(length)
+    return row
+
+
+def main(data, stats=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
+    with measure_phase(stats, 'matrix'):
+        matrix = create_distance_matrix(points)
+
+    with measure_phase(stats, 'search'):
+        route, length = solve_held_karp(matrix, stats=stats)
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(matrix, upper_bound=length)
+
+    with measure_phase(stats, 'format'):
+        result_lst = create_result_list(matrix, route, length)
+        result = format_result_string(result_lst)
+    print(result)
+    print(format_gap_string(length, bound))
+    return result_lst, stats
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
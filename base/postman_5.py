@@ -0,0 +1,176 @@
+"""Точное решение задачи "коммивояжера" поиском в глубину с отсечением по нижней оценке.
+Маршрут наращивается от точки 0, продолжения перебираются от ближайшей точки к дальней.
+Для каждого частичного маршрута оценивается снизу стоимость оставшейся части:
+путь из последней точки через все непосещенные точки обратно в 0 не короче, чем
+минимальное остовное дерево непосещенных точек плюс кратчайшая дуга из последней точки
+в непосещенные плюс кратчайшая дуга из непосещенных в точку 0.
+Оценка считается по длинам дуг со штрафами точек Хелда-Карпа (модуль bound): у всех путей
+из последней точки через те же непосещенные точки в 0 штрафы дают одну и ту же добавку,
+поэтому ее можно вычесть, а остовное дерево со штрафами гораздо ближе к пути, чем без них.
+Ветви, у которых длина частичного маршрута плюс оценка не меньше рекорда, отбрасываются;
+начальный рекорд - маршрут ближайшего соседа, улучшенный 2-opt и Or-opt. Продолжения
+перебираются по возрастанию длины дуги, поэтому после первого продолжения, уже
+не короче рекорда, остальные не проверяются.
+Остовные деревья кэшируются по множеству непосещенных точек (битовой маске),
+размер кеша ограничен MST_CACHE_ENTRIES.
+Метод заполняет промежуток между полным перебором и методом Хелда-Карпа: 15-30 точек."""
+
+
+import numpy as np
+
+from bound import calculate_lower_bound, find_nearest_neighbour_route, find_penalties, format_gap_string
+from distance import create_distance_matrix, create_matrix_distance
+from local_search import optimize_route
+from postman_2 import create_result_row, format_result_string
+from stats import SearchStats, measure_phase
+
+
+# Количество ближайших соседей в списках кандидатов локального поиска для начального рекорда:
+SEED_NEIGHBOURS = 10
+
+# Наибольшее количество остовных деревьев в кеше (при переполнении кеш очищается):
+MST_CACHE_ENTRIES = 1 << 20
+
+
+def calculate_mst_weight(rows, nodes):
+    """
+    Возвращает вес минимального остовного дерева на заданных точках (алгоритм Прима)
+    :param rows: матрица длин дуг в виде списка строк
+    :param nodes: список номеров точек
+    :rtype: float
+    """
+    if len(nodes) < 2:
+        return 0.0
+    rest = nodes[1:]
+    key = [rows[nodes[0]][x] for x in rest]
+    total = 0.0
+    while rest:
+        weight = min(key)
+        j = key.index(weight)
+        total += weight
+        # Удаление перестановкой с последним элементом:
+        node = rest[j]
+        rest[j], key[j] = rest[-1], key[-1]
+        rest.pop()
+        key.pop()
+        row = rows[node]
+        key = [w if w < row[x] else row[x] for w, x in zip(key, rest)]
+    return total
+
+
+def find_optimal_route(matrix, upper_bound=None, route=None, stats=None):
+    """
+    Находит оптимальный маршрут поиском в глубину с отсечением по оценке через остовное дерево.
+    Возвращает кортеж из маршрута (начиная с точки 0) и его длины.
+    Если маршрута короче upper_bound нет, возвращает (route, upper_bound).
+    :type matrix: numpy.ndarray
+    :param upper_bound: длина известного маршрута - начальный рекорд
+        (по умолчанию - маршрут ближайшего соседа, улучшенный локальным поиском)
+    :param route: маршрут длины upper_bound (начиная с точки 0), если он известен
+    :param stats: объект SearchStats для сбора статистики (модуль stats)
+    :rtype: (tuple, float)
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(matrix)
+    if n < 2:
+        return tuple(range(n)), 0.0
+    # Точки, отсортированные по удаленности от каждой точки:
+    nearest = np.argsort(matrix, axis=1).tolist()
+    if upper_bound is None:
+        # Начальный рекорд - маршрут ближайшего соседа, улучшенный локальным поиском:
+        edges = find_nearest_neighbour_route(matrix)[0]
+        neighbours = [[x for x in row if x != i][:SEED_NEIGHBOURS] for i, row in enumerate(nearest)]
+        route = optimize_route([i for i, _ in edges], create_matrix_distance(matrix), neighbours)
+        upper_bound = float(matrix[route, np.roll(route, -1)].sum())
+    lower_bound, pi = find_penalties(matrix, upper_bound)
+    if stats is not None:
+        stats.record_bound(lower_bound, 'lower')
+        stats.record_bound(upper_bound)
+    d = matrix.tolist()
+    # Длины дуг со штрафами и точки, отсортированные по ним:
+    weights = (matrix + pi[:, np.newaxis] + pi[np.newaxis, :]).tolist()
+    by_weight = np.argsort(weights, axis=1).tolist()
+    p = pi.tolist()
+    full = (1 << n) - 1
+    mst_cache = {}
+    best = {'length': upper_bound, 'route': None if route is None else tuple(route), 'expanded': 0, 'pruned': 0}
+    current = [0]
+
+    def get_bound(last, unvisited_mask):
+        # Часть оценки, зависящая только от непосещенных точек, за вычетом их штрафов:
+        base = mst_cache.get(unvisited_mask)
+        if base is None:
+            nodes = [x for x in range(1, n) if unvisited_mask >> x & 1]
+            base = (calculate_mst_weight(weights, nodes) + min(weights[x][0] for x in nodes)
+                    - 2 * sum(p[x] for x in nodes) - p[0])
+            if len(mst_cache) >= MST_CACHE_ENTRIES:
+                mst_cache.clear()
+            mst_cache[unvisited_mask] = base
+        for x in by_weight[last]:
+            if unvisited_mask >> x & 1:
+                return base + weights[last][x] - p[last]
+
+    def extend(last, visited, cost):
+        if visited == full:
+            length = cost + d[last][0]
+            if length < best['length']:
+                best['length'], best['route'] = length, tuple(current)
+                if stats is not None:
+                    stats.record_bound(length)
+            return
+        if cost + get_bound(last, full ^ visited) >= best['length']:
+            best['pruned'] += 1
+            return
+        best['expanded'] += 1
+        for city in nearest[last]:
+            if visited >> city & 1:
+                continue
+            new_cost = cost + d[last][city]
+            # Остальные продолжения не короче:
+            if new_cost >= best['length']:
+                best['pruned'] += 1
+                break
+            current.append(city)
+            extend(city, visited | 1 << city, new_cost)
+            current.pop()
+
+    extend(0, 1, 0.0)
+    if stats is not None:
+        stats.add('nodes_expanded', best['expanded'])
+        stats.add('nodes_pruned', best['pruned'])
+    return best['route'], best['length']
+
+
+def main(data, stats=None):
+    # Словарь координат точек:
+    points = {x: y for x, y in enumerate(list(data.keys()))}
+    # Статистика работы решателя:
+    if stats is None:
+        stats = SearchStats()
+    with measure_phase(stats, 'matrix'):
+        matrix = create_distance_matrix(points)
+
+    with measure_phase(stats, 'search'):
+        route, length = find_optimal_route(matrix, stats=stats)
+    with measure_phase(stats, 'bound'):
+        bound = calculate_lower_bound(matrix, upper_bound=length)
+
+    with measure_phase(stats, 'format'):
+        result_lst = create_result_row(matrix.tolist(), route)
+        result = format_result_string(result_lst)
+    print(result)
+    print(format_gap_string(length, bound))
+    return result_lst, stats
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    DATA = {
+        (0, 2): 'Почтовое отделение',
+        (2, 5): 'Ул. Грибоедова',
+        (5, 2): 'Ул. Бейкер стрит',
+        (6, 6): 'Ул. Большая Садовая',
+        (8, 3): 'Вечнозелёная Аллея',
+    }
+
+    main(DATA)
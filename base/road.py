@@ -0,0 +1,236 @@
+"""Расстояния по дорожной сети вместо расстояний по прямой.
+Граф улиц задается файлом списка дуг: в каждой строке "начало конец длина" (через пробелы
+или запятые, строки с # - комментарии). Имена вершин - произвольные строки без пробелов.
+Граф хранится в сжатом построчном виде (indptr, indices, weights). Матрица расстояний между
+остановками строится алгоритмом Дейкстры с кучей из каждой остановки; поиск из остановки
+заканчивается, как только найдены расстояния до всех остановок. Поиски из разных остановок
+выполняются на пуле процессов, граф передается каждому процессу один раз.
+Результаты кешируются на диске: разобранный граф - по содержимому файла, матрица -
+по графу и списку остановок, поэтому повторный ежедневный запуск по тому же графу не считает
+кратчайшие пути заново. Полученную матрицу принимают решатели postman_3, postman_4 и другие."""
+
+
+import hashlib
+import heapq
+from multiprocessing import Pool
+import os
+
+import numpy as np
+
+from postman_3 import fill_distance_list, find_optimal_route, format_result_string, sort_list_by_tuples
+
+
+# Состояние процесса пула: граф в виде списков (заполняется в init_worker)
+WORKER_STATE = {}
+
+
+def raise_line_error(lines, number, expected='"начало конец длина"'):
+    """
+    Вызывает ошибку разбора строки number (с 1) списка дуг
+    :type lines: list
+    :type number: int
+    :param expected: что ожидалось в строке
+    """
+    raise ValueError(f'Строка {number}: ожидается {expected}, получено {lines[number - 1].strip()!r}')
+
+
+def parse_edge_list(text, directed=False):
+    """
+    Разбирает текст списка дуг. Возвращает граф (indptr, indices, weights) и массив имен вершин.
+    Строка с другим количеством полей, нечисловой, отрицательной или бесконечной длиной -
+    ошибка ValueError с номером строки.
+    :param text: строки "начало конец длина"
+    :param directed: ориентированный ли граф (иначе каждая дуга добавляется в обе стороны)
+    :rtype: (tuple, numpy.ndarray)
+    """
+    lines = text.splitlines()
+    # Запятые заменены пробелами, поэтому отдельная запятая - разделитель строк, а не поле:
+    tokens = np.array(' , '.join(line.split('#', 1)[0].replace(',', ' ') for line in lines).split() + [','])
+    breaks = np.flatnonzero(tokens == ',')
+    counts = np.diff(breaks, prepend=-1) - 1
+    bad = np.flatnonzero((counts != 0) & (counts != 3))
+    if len(bad):
+        raise_line_error(lines, int(bad[0]) + 1)
+    fields = np.delete(tokens, breaks).reshape(-1, 3)
+    try:
+        weights = fields[:, 2].astype(np.float64)
+    except ValueError:
+        for number, length in zip(np.flatnonzero(counts).tolist(), fields[:, 2].tolist()):
+            try:
+                float(length)
+            except ValueError:
+                raise_line_error(lines, number + 1)
+        raise
+    # Длина - конечное неотрицательное число (nan не проходит сравнение):
+    bad = np.flatnonzero(~(np.isfinite(weights) & (weights >= 0)))
+    if len(bad):
+        raise_line_error(lines, int(np.flatnonzero(counts)[bad[0]]) + 1, 'конечная неотрицательная длина')
+    names, ends = np.unique(fields[:, :2], return_inverse=True)
+    ends = ends.reshape(-1, 2)
+    first, second = ends[:, 0], ends[:, 1]
+    if not directed:
+        first, second = np.concatenate([first, second]), np.concatenate([second, first])
+        weights = np.concatenate([weights, weights])
+    order = np.argsort(first, kind='stable')
+    indptr = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(first, minlength=len(names)), out=indptr[1:])
+    return (indptr, second[order].astype(np.int64), weights[order]), names
+
+
+def calculate_digest(content, directed=False):
+    """
+    Возвращает отпечаток графа - хеш содержимого списка дуг и признака ориентированности
+    :type content: bytes
+    :type directed: bool
+    :rtype: str
+    """
+    return hashlib.sha1(content + (b'directed' if directed else b'undirected')).hexdigest()
+
+
+def load_graph(path, directed=False, cache_dir=None):
+    """
+    Загружает граф из файла списка дуг. Если задан каталог кеша, разобранный граф
+    сохраняется в нем и при следующей загрузке того же файла читается оттуда.
+    Возвращает граф (indptr, indices, weights), массив имен вершин и отпечаток графа.
+    :type path: str
+    :type directed: bool
+    :type cache_dir: str
+    :rtype: (tuple, numpy.ndarray, str)
+    """
+    with open(path, 'rb') as file:
+        content = file.read()
+    digest = calculate_digest(content, directed)
+    cache_path = os.path.join(cache_dir, f'graph-{digest}.npz') if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            return (cached['indptr'], cached['indices'], cached['weights']), cached['names'], digest
+    graph, names = parse_edge_list(content.decode('utf-8'), directed)
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(cache_path, indptr=graph[0], indices=graph[1], weights=graph[2], names=names)
+    return graph, names, digest
+
+
+def find_shortest_distances(indptr, indices, weights, source, targets):
+    """
+    Алгоритм Дейкстры с кучей из вершины source. Останавливается, когда найдены расстояния
+    до всех вершин targets. Недостижимым вершинам соответствует np.inf.
+    :param indptr: список начал дуг каждой вершины
+    :param indices: список концов дуг
+    :param weights: список длин дуг
+    :type source: int
+    :type targets: list
+    :rtype: list
+    """
+    distances = [np.inf] * (len(indptr) - 1)
+    distances[source] = 0.0
+    settled = bytearray(len(indptr) - 1)
+    left = len(set(targets))
+    is_target = bytearray(len(indptr) - 1)
+    for t in targets:
+        is_target[t] = 1
+    heap = [(0.0, source)]
+    push, pop = heapq.heappush, heapq.heappop
+    while heap and left:
+        d, v = pop(heap)
+        if settled[v]:
+            continue
+        settled[v] = 1
+        left -= is_target[v]
+        for e in range(indptr[v], indptr[v + 1]):
+            u = indices[e]
+            new = d + weights[e]
+            if new < distances[u]:
+                distances[u] = new
+                push(heap, (new, u))
+    return [distances[t] for t in targets]
+
+
+def init_worker(graph, targets):
+    """
+    Инициализирует процесс пула: сохраняет граф в виде списков и номера остановок
+    :type graph: tuple
+    :type targets: list
+    :return: None
+    """
+    WORKER_STATE['graph'] = [array.tolist() for array in graph]
+    WORKER_STATE['targets'] = targets
+
+
+def search_from(source):
+    """
+    Возвращает строку матрицы расстояний для одной остановки. Выполняется в процессе пула.
+    :type source: int
+    :rtype: list
+    """
+    return find_shortest_distances(*WORKER_STATE['graph'], source, WORKER_STATE['targets'])
+
+
+def create_road_matrix(graph, stops, processes=None, cache_dir=None, digest=None):
+    """
+    Строит матрицу кратчайших расстояний по графу между остановками (np.inf на главной диагонали
+    и для недостижимых пар). Если заданы каталог кеша и отпечаток графа, матрица сохраняется
+    и при повторном запросе с теми же остановками читается из кеша.
+    :param graph: граф (indptr, indices, weights)
+    :param stops: номера вершин-остановок
+    :param processes: количество процессов (по умолчанию - количество ядер, 1 - без пула)
+    :param cache_dir: каталог кеша
+    :param digest: отпечаток графа (из load_graph)
+    :rtype: numpy.ndarray
+    """
+    stops = [int(x) for x in stops]
+    cache_path = None
+    if cache_dir and digest:
+        key = hashlib.sha1(f'{digest}:{stops}'.encode()).hexdigest()
+        cache_path = os.path.join(cache_dir, f'matrix-{key}.npy')
+        if os.path.exists(cache_path):
+            return np.load(cache_path)
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(stops) < 2:
+        init_worker(graph, stops)
+        rows = [search_from(source) for source in stops]
+    else:
+        with Pool(processes, initializer=init_worker, initargs=(graph, stops)) as pool:
+            rows = pool.map(search_from, stops, chunksize=max(1, len(stops) // (4 * processes)))
+    matrix = np.array(rows, dtype=np.float64).reshape(len(stops), len(stops))
+    np.fill_diagonal(matrix, np.inf)
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cache_path, matrix)
+    return matrix
+
+
+def main(data, stops, cache_dir=None):
+    # Граф улиц из текста списка дуг и номера вершин-остановок (первая остановка - почтовое отделение):
+    graph, names = parse_edge_list(data)
+    digest = calculate_digest(data.encode('utf-8'))
+    index = {name: i for i, name in enumerate(names.tolist())}
+    matrix = create_road_matrix(graph, [index[stop] for stop in stops], cache_dir=cache_dir, digest=digest)
+    # Список дуг оптимального маршрута:
+    result_lst = sort_list_by_tuples(find_optimal_route(matrix))
+    # Список соответсвующмх расстояний:
+    dist_lst = fill_distance_list(matrix, result_lst)
+    print(format_result_string(result_lst, dist_lst))
+
+
+if __name__ == '__main__':
+    ###################### Исходные данные: ##########################
+    # Перекрестки и улицы между ними: начало конец длина
+    EDGES = """
+    post_office     crossing_1          2.5
+    crossing_1      griboedova          2.0
+    crossing_1      crossing_2          3.0
+    crossing_2      baker_street        1.5
+    post_office     baker_street        6.0
+    griboedova      crossing_3          3.5
+    crossing_3      bolshaya_sadovaya   1.0
+    crossing_2      crossing_3          4.0
+    baker_street    crossing_4          2.0
+    crossing_4      evergreen_terrace   1.5
+    crossing_4      bolshaya_sadovaya   4.5
+    bolshaya_sadovaya evergreen_terrace 4.0
+    """
+    STOPS = ['post_office', 'griboedova', 'baker_street', 'bolshaya_sadovaya', 'evergreen_terrace']
+
+    main(EDGES, STOPS)
+    # Граф из файла: main(open('streets.txt', encoding='utf-8').read(), STOPS, cache_dir='cache')
@@ -0,0 +1,180 @@
+"""Пространственный индекс точек - равномерная сетка.
+Нужен, чтобы находить k ближайших соседей каждой точки и точки в заданном радиусе,
+не считая полную матрицу расстояний n x n: для 100 000 и более точек она не помещается в память.
+Точки сортируются по номеру ячейки сетки (в среднем CELL_POINTS точек на ячейку),
+поэтому точки одной строки ячеек лежат в отсортированном массиве подряд.
+Запросы обрабатываются пачками: все точки запроса из одной ячейки сравниваются сразу
+со всеми точками соседних ячеек одной векторной операцией. Кольцо соседних ячеек
+расширяется, пока k-й найденный сосед не окажется ближе границы просмотренной области."""
+
+
+import math
+
+import numpy as np
+
+from distance import points_to_array
+
+
+# Среднее количество точек в одной ячейке сетки:
+CELL_POINTS = 8
+
+
+class GridIndex:
+    """Равномерная сетка над координатами точек"""
+
+    def __init__(self, points, cell_size=None):
+        self.coords = points_to_array(points)
+        self.n = len(self.coords)
+        self.origin = self.coords.min(axis=0) if self.n else np.zeros(2)
+        extent = self.coords.max(axis=0) - self.origin if self.n else np.zeros(2)
+        if cell_size is None:
+            area = max(extent[0], 1e-12) * max(extent[1], 1e-12)
+            cell_size = math.sqrt(area * CELL_POINTS / max(self.n, 1))
+            if extent.max() > 0:
+                cell_size = max(cell_size, extent.max() / 4096)
+            else:
+                cell_size = 1.0
+        self.cell_size = float(cell_size)
+        self.nx = int(extent[0] // self.cell_size) + 1
+        self.ny = int(extent[1] // self.cell_size) + 1
+        cells = self.get_cells(self.coords)
+        cell_id = cells[:, 1] * self.nx + cells[:, 0]
+        self.order = np.argsort(cell_id, kind='stable').astype(np.int32)
+        self.cell_start = np.searchsorted(cell_id[self.order], np.arange(self.nx * self.ny + 1)).astype(np.int64)
+
+    def get_cells(self, coords):
+        """
+        Возвращает координаты ячеек (столбец, строка) для массива точек. Точки вне сетки
+        относятся к крайним ячейкам.
+        :type coords: numpy.ndarray
+        :rtype: numpy.ndarray
+        """
+        cells = np.floor((coords - self.origin) / self.cell_size).astype(np.int64)
+        cells[:, 0] = np.clip(cells[:, 0], 0, self.nx - 1)
+        cells[:, 1] = np.clip(cells[:, 1], 0, self.ny - 1)
+        return cells
+
+    def get_candidates(self, cx, cy, r):
+        """
+        Возвращает номера точек из квадрата ячеек со стороной 2r + 1 с центром в ячейке (cx, cy)
+        :rtype: numpy.ndarray
+        """
+        left, right = max(cx - r, 0), min(cx + r, self.nx - 1)
+        parts = []
+        for row in range(max(cy - r, 0), min(cy + r, self.ny - 1) + 1):
+            base = row * self.nx
+            parts.append(self.order[self.cell_start[base + left]:self.cell_start[base + right + 1]])
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+
+    def covers_grid(self, cx, cy, r):
+        """Покрывает ли квадрат ячеек радиуса r с центром (cx, cy) всю сетку"""
+        return cx - r <= 0 and cy - r <= 0 and cx + r >= self.nx - 1 and cy + r >= self.ny - 1
+
+    def group_queries(self, coords):
+        """
+        Группирует точки запроса по ячейкам сетки. Возвращает список кортежей
+        (столбец, строка, номера точек запроса в этой ячейке).
+        :type coords: numpy.ndarray
+        :rtype: list
+        """
+        cells = self.get_cells(coords)
+        cell_id = cells[:, 1] * self.nx + cells[:, 0]
+        order = np.argsort(cell_id, kind='stable')
+        bounds = np.flatnonzero(np.diff(cell_id[order])) + 1
+        groups = []
+        for rows in np.split(order, bounds):
+            if len(rows):
+                groups.append((int(cells[rows[0], 0]), int(cells[rows[0], 1]), rows))
+        return groups
+
+    def query(self, points, k, exclude=None):
+        """
+        Находит k ближайших точек индекса для каждой точки запроса.
+        :param points: координаты точек запроса (массив m x 2)
+        :type k: int
+        :param exclude: массив номеров точек индекса, которые нужно исключить
+            для соответствующей точки запроса (например, саму точку)
+        :return: массивы номеров (int32) и расстояний размерностью m x k по возрастанию расстояния
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        coords = points_to_array(points)
+        m = len(coords)
+        k = min(k, self.n - (0 if exclude is None else 1))
+        indices = np.empty((m, k), dtype=np.int32)
+        distances = np.empty((m, k), dtype=np.float64)
+        if k <= 0:
+            return indices, distances
+        for cx, cy, rows in self.group_queries(coords):
+            r = 1
+            while len(rows):
+                cand = self.get_candidates(cx, cy, r)
+                full = self.covers_grid(cx, cy, r)
+                if len(cand) < k + (0 if exclude is None else 1) and not full:
+                    r += 1
+                    continue
+                q = coords[rows]
+                dist = np.hypot(q[:, 0, np.newaxis] - self.coords[cand, 0], q[:, 1, np.newaxis] - self.coords[cand, 1])
+                if exclude is not None:
+                    dist[cand[np.newaxis, :] == exclude[rows, np.newaxis]] = np.inf
+                if k < len(cand):
+                    part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+                else:
+                    part = np.broadcast_to(np.arange(len(cand)), (len(rows), len(cand)))
+                part_dist = np.take_along_axis(dist, part, axis=1)
+                sort = np.argsort(part_dist, axis=1, kind='stable')
+                part_dist = np.take_along_axis(part_dist, sort, axis=1)
+                # Результат точен, если k-й сосед ближе любой точки за пределами просмотренных ячеек:
+                done = np.ones(len(rows), dtype=bool) if full else part_dist[:, -1] <= r * self.cell_size
+                indices[rows[done]] = cand[np.take_along_axis(part, sort, axis=1)[done]]
+                distances[rows[done]] = part_dist[done]
+                rows = rows[~done]
+                r += 1
+        return indices, distances
+
+    def knn(self, k):
+        """
+        Возвращает массив n x k (int32) номеров k ближайших соседей каждой точки индекса
+        (по возрастанию расстояния, без самой точки)
+        :type k: int
+        :rtype: numpy.ndarray
+        """
+        return self.query(self.coords, k, exclude=np.arange(self.n))[0]
+
+    def query_radius(self, points, radius):
+        """
+        Находит для каждой точки запроса все точки индекса на расстоянии не больше radius.
+        Результат в сжатом построчном виде: номера соседей точки запроса i - это
+        indices[indptr[i]:indptr[i + 1]].
+        :param points: координаты точек запроса (массив m x 2)
+        :type radius: float
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        coords = points_to_array(points)
+        r = max(1, int(math.ceil(radius / self.cell_size)))
+        found = [None] * len(coords)
+        for cx, cy, rows in self.group_queries(coords):
+            cand = self.get_candidates(cx, cy, r)
+            q = coords[rows]
+            dist = np.hypot(q[:, 0, np.newaxis] - self.coords[cand, 0], q[:, 1, np.newaxis] - self.coords[cand, 1])
+            for row, mask in zip(rows, dist <= radius):
+                found[row] = cand[mask]
+        counts = np.array([len(x) for x in found], dtype=np.int64)
+        indptr = np.zeros(len(coords) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        indices = np.concatenate(found).astype(np.int32) if found else np.empty(0, dtype=np.int32)
+        return indptr, indices
+
+    def radius_neighbours(self, radius):
+        """
+        Возвращает для каждой точки индекса все другие точки на расстоянии не больше radius
+        в сжатом построчном виде (indptr, indices)
+        :type radius: float
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        indptr, indices = self.query_radius(self.coords, radius)
+        owner = np.repeat(np.arange(self.n), np.diff(indptr))
+        keep = indices != owner
+        counts = np.bincount(owner[keep], minlength=self.n)
+        indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return indptr, indices[keep]
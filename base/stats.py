@@ -0,0 +1,121 @@
+"""Сбор статистики работы решателей.
+Решатели принимают необязательный параметр stats - объект SearchStats - и записывают в него
+количество раскрытых и отсеченных узлов (или перебранных маршрутов), изменения рекорда и
+нижней оценки по ходу поиска. Время этапов (построение матрицы, поиск, вывод) и пиковая
+память замеряются контекстным менеджером phase. Функции main модулей решателей создают
+объект статистики, если он не передан, и возвращают его вместе с результатом.
+Если stats не передан, решатели ведут только локальные счетчики и ничего не записывают,
+поэтому статистику можно не отключать в рабочем режиме. Пиковая память по умолчанию - пиковый
+размер процесса (resource), точный учет выделений Python (tracemalloc) включается отдельно,
+так как замедляет работу."""
+
+
+from contextlib import contextmanager, nullcontext
+import json
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # resource есть только в Unix:
+    resource = None
+
+
+def get_peak_rss():
+    """
+    Возвращает пиковый размер процесса в байтах (None, если недоступен)
+    :rtype: int or None
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure_phase(stats, name):
+    """
+    Возвращает контекстный менеджер замера этапа name или пустой менеджер, если stats не задан
+    :type stats: SearchStats or None
+    :type name: str
+    """
+    return stats.phase(name) if stats is not None else nullcontext()
+
+
+class SearchStats:
+    """Статистика одного запуска решателя"""
+
+    def __init__(self, trace_memory=False):
+        """
+        :param trace_memory: учитывать пиковую память выделений Python через tracemalloc
+        """
+        self.started = time.perf_counter()
+        self.counters = {}
+        self.bounds = []
+        self.phases = {}
+        self.trace_memory = trace_memory
+        self.peak_memory = None
+
+    def add(self, name, value=1):
+        """
+        Увеличивает счетчик name на value
+        :type name: str
+        :type value: int
+        :return: None
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_bound(self, value, kind='upper'):
+        """
+        Записывает новое значение оценки: 'upper' - рекорд (длина лучшего маршрута),
+        'lower' - нижняя оценка
+        :type value: float
+        :type kind: str
+        :return: None
+        """
+        self.bounds.append((time.perf_counter() - self.started, kind, float(value)))
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Замеряет время этапа name (повторные этапы с тем же именем суммируются) и пиковую память
+        :type name: str
+        """
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+            if self.trace_memory and tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1]
+                self.peak_memory = max(self.peak_memory or 0, peak)
+                if tracing:
+                    tracemalloc.stop()
+
+    def to_dict(self):
+        """
+        Возвращает статистику в виде словаря
+        :rtype: dict
+        """
+        return {
+            'elapsed': time.perf_counter() - self.started,
+            'counters': dict(self.counters),
+            'bounds': [{'time': t, 'kind': kind, 'value': value} for t, kind, value in self.bounds],
+            'phases': dict(self.phases),
+            'peak_memory': self.peak_memory,
+            'peak_rss': get_peak_rss(),
+        }
+
+    def to_json(self, path=None):
+        """
+        Возвращает статистику в формате JSON и, если задан путь, записывает ее в файл
+        :type path: str
+        :rtype: str
+        """
+        text = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(text)
+        return text
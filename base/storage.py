@@ -0,0 +1,145 @@
+"""Хранение больших матриц расстояний в файле, отображаемом в память.
+Полная матрица float64 из 50 000 точек занимает 20 ГБ, поэтому матрица хранится:
+- в сжатом виде - только верхний треугольник без диагонали (n * (n - 1) / 2 элементов,
+  порядок как в distance.create_condensed_matrix);
+- с выбираемой точностью: float64, float32 или uint16 - целое число шагов scale
+  (шаг - диагональ охватывающего прямоугольника / 65535, погрешность не больше scale / 2);
+- в файле .npy, который открывается через отображение в память (mmap): страницы читаются
+  с диска по мере обращения, а несколько процессов, открывших один файл только для чтения,
+  используют общие страницы кеша операционной системы.
+Описание матрицы (n, тип, шаг) хранится рядом в файле .json. Объект DistanceStore
+передается в процессы пула по пути к файлу, а не копированием данных."""
+
+
+import json
+
+import numpy as np
+
+from distance import get_block_size, get_condensed_index, points_to_array
+
+
+# Допустимые типы элементов:
+PRECISIONS = ('float64', 'float32', 'uint16')
+
+
+class DistanceStore:
+    """Сжатая матрица расстояний в файле, отображаемом в память"""
+
+    def __init__(self, path, mode='r'):
+        """
+        Открывает ранее созданную матрицу
+        :param path: путь к файлу .npy с данными
+        :param mode: режим отображения ('r' - только чтение, 'r+' - чтение и запись)
+        """
+        with open(path + '.json') as file:
+            meta = json.load(file)
+        self.path = path
+        self.n = meta['n']
+        self.scale = meta['scale']
+        self.data = np.load(path, mmap_mode=mode)
+
+    def __len__(self):
+        return self.n
+
+    def __reduce__(self):
+        # В процессы пула передается только путь, данные отображаются заново:
+        return DistanceStore, (self.path,)
+
+    @classmethod
+    def create(cls, path, points, precision='float32'):
+        """
+        Считает расстояния между точками построчно и записывает их в файл.
+        Дополнительная память не зависит от количества точек.
+        :param path: путь к файлу .npy с данными
+        :param points: словарь точек или массив координат n x 2
+        :param precision: тип элементов - 'float64', 'float32' или 'uint16'
+        :rtype: DistanceStore
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f'Неизвестная точность {precision!r}, допустимо: {", ".join(PRECISIONS)}')
+        coords = points_to_array(points)
+        n = len(coords)
+        scale = None
+        if precision == 'uint16':
+            extent = coords.max(axis=0) - coords.min(axis=0) if n else np.zeros(2)
+            scale = float(np.hypot(*extent)) / np.iinfo(np.uint16).max or 1.0
+        data = np.lib.format.open_memmap(path, mode='w+', dtype=precision, shape=(n * (n - 1) // 2,))
+        x, y = coords[:, 0], coords[:, 1]
+        pos = 0
+        step = get_block_size(n)
+        for start in range(0, n - 1, step):
+            # Строки блока в сжатой матрице идут подряд:
+            rows = range(start, min(start + step, n - 1))
+            row = np.concatenate([np.hypot(x[i + 1:] - x[i], y[i + 1:] - y[i]) for i in rows])
+            if scale is not None:
+                row = np.rint(row / scale)
+            data[pos:pos + len(row)] = row
+            pos += len(row)
+        data.flush()
+        del data
+        with open(path + '.json', 'w') as file:
+            json.dump({'n': n, 'dtype': precision, 'scale': scale}, file)
+        return cls(path)
+
+    def decode(self, values):
+        """
+        Переводит хранимые значения в расстояния (float64)
+        :type values: numpy.ndarray
+        :rtype: numpy.ndarray
+        """
+        values = np.asarray(values, dtype=np.float64)
+        return values * self.scale if self.scale is not None else values
+
+    def get(self, i, j):
+        """
+        Возвращает расстояние между точками i и j (0 для i == j)
+        :type i: int
+        :type j: int
+        :rtype: float
+        """
+        if i == j:
+            return 0.0
+        value = float(self.data[get_condensed_index(i, j, self.n)])
+        return value * self.scale if self.scale is not None else value
+
+    def get_row(self, i, diagonal=0.0):
+        """
+        Возвращает строку i полной матрицы расстояний
+        :type i: int
+        :param diagonal: значение для самой точки i
+        :rtype: numpy.ndarray
+        """
+        before = get_condensed_index(np.arange(i), i, self.n)
+        start = get_condensed_index(i, i + 1, self.n) if i < self.n - 1 else len(self.data)
+        row = np.concatenate([self.data[before], self.data[start:start + self.n - 1 - i]])
+        return np.insert(self.decode(row), i, diagonal)
+
+    def get_submatrix(self, nodes, diagonal=0.0):
+        """
+        Возвращает полную матрицу расстояний между точками nodes (float64)
+        :param nodes: номера точек
+        :param diagonal: значение на главной диагонали (np.inf для метода Литтла)
+        :rtype: numpy.ndarray
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        i, j = np.meshgrid(nodes, nodes, indexing='ij')
+        other = i != j
+        matrix = np.full(i.shape, diagonal, dtype=np.float64)
+        matrix[other] = self.decode(self.data[get_condensed_index(i[other], j[other], self.n)])
+        return matrix
+
+    def to_matrix(self, diagonal=0.0):
+        """
+        Разворачивает хранимую матрицу в полную матрицу n x n (только для небольших n)
+        :param diagonal: значение на главной диагонали
+        :rtype: numpy.ndarray
+        """
+        return self.get_submatrix(np.arange(self.n), diagonal)
+
+    def create_distance(self):
+        """
+        Возвращает функцию dist(i, j), читающую расстояния из файла - для алгоритмов,
+        которым нужны отдельные расстояния (например, local_search.optimize_route)
+        :rtype: function
+        """
+        return self.get
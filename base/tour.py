@@ -0,0 +1,281 @@
+"""Представления замкнутого маршрута для алгоритмов локального поиска (2-opt, Or-opt, k-opt).
+TourArray - массив точек с обратным индексом позиций: разворот участка стоит O(n).
+TwoLevelTour - двухуровневый список: маршрут разбит примерно на sqrt(n) сегментов,
+у каждого сегмента есть флаг разворота. Разворот участка разрезает не более двух сегментов
+и переставляет целые сегменты с инверсией флага, поэтому стоит O(sqrt(n)), как и запросы
+next/prev/between. На маршрутах из десятков тысяч точек это главный выигрыш 2-opt.
+Оба класса имеют одинаковый интерфейс и переводятся в обычный список номеров точек
+и список дуг, которые используют format_result_string и fill_distance_list."""
+
+
+def route_to_edges(route):
+    """
+    Принимает маршрут - последовательность номеров точек - и возвращает список дуг обхода
+    [(route[0], route[1]), ..., (route[-1], route[0])]
+    :type route: list
+    :rtype: list
+    """
+    route = list(route)
+    return list(zip(route, route[1:] + route[:1]))
+
+
+def edges_to_route(edges, start=0):
+    """
+    Принимает список дуг замкнутого маршрута в любом порядке и возвращает маршрут -
+    последовательность точек, начиная с точки start
+    :type edges: list
+    :type start: int
+    :rtype: list
+    """
+    succ = dict(edges)
+    route = [start]
+    current = succ[start]
+    while current != start:
+        route.append(current)
+        current = succ[current]
+    return route
+
+
+class TourArray:
+    """Маршрут в виде массива точек и обратного индекса позиций"""
+
+    def __init__(self, route):
+        self.tour = list(route)
+        self.n = len(self.tour)
+        self.pos = [0] * self.n
+        for i, city in enumerate(self.tour):
+            self.pos[city] = i
+
+    def next(self, city):
+        """Следующая точка маршрута"""
+        return self.tour[(self.pos[city] + 1) % self.n]
+
+    def prev(self, city):
+        """Предыдущая точка маршрута"""
+        return self.tour[self.pos[city] - 1]
+
+    def between(self, a, b, c):
+        """Лежит ли b на пути от a до c в прямом направлении (включая концы)"""
+        i, j, k = self.pos[a], self.pos[b], self.pos[c]
+        if i <= k:
+            return i <= j <= k
+        return j >= i or j <= k
+
+    def reverse(self, a, b):
+        """
+        Разворачивает участок маршрута от a до b (в прямом направлении).
+        Если участок длиннее половины маршрута, разворачивается дополнение - получается
+        тот же замкнутый маршрут, обойденный в обратную сторону.
+        """
+        i, j = self.pos[a], self.pos[b]
+        length = (j - i) % self.n + 1
+        if 2 * length > self.n:
+            i, j = self.pos[self.next(b)], self.pos[self.prev(a)]
+            length = self.n - length
+        tour, pos, n = self.tour, self.pos, self.n
+        for _ in range(length // 2):
+            tour[i], tour[j] = tour[j], tour[i]
+            pos[tour[i]] = i
+            pos[tour[j]] = j
+            i = (i + 1) % n
+            j = (j - 1) % n
+
+    def make_2opt(self, a, b, c, d):
+        """
+        Удаляет дуги (a, b) и (c, d) и добавляет дуги (a, c) и (b, d).
+        Дуги должны быть ориентированы одинаково: b следует за a, а d за c, либо наоборот.
+        """
+        if self.next(a) == b:
+            self.reverse(b, c)
+        else:
+            self.reverse(a, d)
+
+    def to_list(self):
+        """Маршрут списком, начиная с точки 0"""
+        start = self.pos[0]
+        return self.tour[start:] + self.tour[:start]
+
+    def to_edges(self):
+        """Список дуг маршрута, начиная с точки 0"""
+        return route_to_edges(self.to_list())
+
+
+class Segment:
+    """Сегмент двухуровневого списка: точки в порядке хранения и флаг разворота"""
+
+    __slots__ = ('cities', 'reversed', 'rank')
+
+    def __init__(self, cities, rank):
+        self.cities = cities
+        self.reversed = False
+        self.rank = rank
+
+    def first(self):
+        """Первая точка сегмента с учетом разворота"""
+        return self.cities[-1] if self.reversed else self.cities[0]
+
+    def last(self):
+        """Последняя точка сегмента с учетом разворота"""
+        return self.cities[0] if self.reversed else self.cities[-1]
+
+    def ordered(self):
+        """Точки сегмента в порядке обхода"""
+        return self.cities[::-1] if self.reversed else list(self.cities)
+
+
+class TwoLevelTour:
+    """
+    Маршрут в виде двухуровневого списка. Для каждой точки хранятся ее сегмент и индекс
+    в списке точек сегмента; сегменты хранятся списком в порядке обхода.
+    Когда сегментов после разрезаний становится вдвое больше расчетного, структура
+    перестраивается заново, так что средняя стоимость операций остается O(sqrt(n)).
+    """
+
+    def __init__(self, route, group_size=None):
+        route = list(route)
+        self.n = len(route)
+        self.group_size = group_size or max(8, int(self.n ** 0.5))
+        self.segment_of = [None] * self.n
+        self.index_of = [0] * self.n
+        self.build(route)
+
+    @classmethod
+    def from_list(cls, route):
+        """Строит маршрут по списку номеров точек"""
+        return cls(route)
+
+    @classmethod
+    def from_edges(cls, edges):
+        """Строит маршрут по списку дуг, как его возвращает find_min_distance"""
+        return cls(edges_to_route(edges))
+
+    def build(self, route):
+        """Разбивает маршрут на сегменты одинакового размера"""
+        self.segments = []
+        for rank, start in enumerate(range(0, len(route), self.group_size)):
+            segment = Segment(route[start:start + self.group_size], rank)
+            self.segments.append(segment)
+            self.index_cities(segment)
+        self.max_segments = 2 * len(self.segments) + 2
+
+    def index_cities(self, segment):
+        """Обновляет сегмент и индекс для всех точек сегмента"""
+        segment_of, index_of = self.segment_of, self.index_of
+        for i, city in enumerate(segment.cities):
+            segment_of[city] = segment
+            index_of[city] = i
+
+    def renumber(self, start=0, stop=None):
+        """Пересчитывает порядковые номера сегментов в диапазоне"""
+        segments = self.segments
+        for rank in range(start, len(segments) if stop is None else stop):
+            segments[rank].rank = rank
+
+    def next(self, city):
+        """Следующая точка маршрута"""
+        segment = self.segment_of[city]
+        i = self.index_of[city]
+        if segment.reversed:
+            if i > 0:
+                return segment.cities[i - 1]
+        elif i + 1 < len(segment.cities):
+            return segment.cities[i + 1]
+        return self.segments[(segment.rank + 1) % len(self.segments)].first()
+
+    def prev(self, city):
+        """Предыдущая точка маршрута"""
+        segment = self.segment_of[city]
+        i = self.index_of[city]
+        if segment.reversed:
+            if i + 1 < len(segment.cities):
+                return segment.cities[i + 1]
+        elif i > 0:
+            return segment.cities[i - 1]
+        return self.segments[segment.rank - 1].last()
+
+    def sequence(self, city):
+        """Порядковый номер точки в обходе в виде пары (номер сегмента, позиция в сегменте)"""
+        segment = self.segment_of[city]
+        i = self.index_of[city]
+        if segment.reversed:
+            i = len(segment.cities) - 1 - i
+        return segment.rank, i
+
+    def between(self, a, b, c):
+        """Лежит ли b на пути от a до c в прямом направлении (включая концы)"""
+        i, j, k = self.sequence(a), self.sequence(b), self.sequence(c)
+        if i <= k:
+            return i <= j <= k
+        return j >= i or j <= k
+
+    def split(self, city):
+        """
+        Разрезает сегмент точки так, чтобы city стала первой точкой своего сегмента
+        """
+        segment = self.segment_of[city]
+        pos = self.sequence(city)[1]
+        if pos == 0:
+            return
+        order = segment.ordered()
+        head = Segment(order[:pos], segment.rank)
+        tail = Segment(order[pos:], segment.rank + 1)
+        self.index_cities(head)
+        self.index_cities(tail)
+        self.segments[segment.rank:segment.rank + 1] = [head, tail]
+        self.renumber(segment.rank + 2)
+
+    def reverse(self, a, b):
+        """
+        Разворачивает участок маршрута от a до b (в прямом направлении).
+        Участок разрезается по границам сегментов, после чего разворачивается
+        последовательность целых сегментов с инверсией их флагов. Если участок занимает
+        больше половины сегментов, разворачивается дополнение - получается тот же
+        замкнутый маршрут, обойденный в обратную сторону.
+        """
+        after_b = self.next(b)
+        if a == b or after_b == a:
+            return
+        self.split(a)
+        self.split(after_b)
+        first = self.segment_of[a].rank
+        last = self.segment_of[b].rank
+        count = len(self.segments)
+        if (last - first) % count + 1 > count // 2:
+            first, last = (last + 1) % count, (first - 1) % count
+        if first <= last:
+            run = self.segments[first:last + 1]
+            run.reverse()
+            for segment in run:
+                segment.reversed = not segment.reversed
+            self.segments[first:last + 1] = run
+            self.renumber(first, last + 1)
+        else:
+            # Участок проходит через конец списка сегментов - поворачиваем список:
+            self.segments = self.segments[first:] + self.segments[:first]
+            self.renumber()
+            self.reverse(self.segments[0].first(), self.segments[(last - first) % count].last())
+            return
+        if len(self.segments) > self.max_segments:
+            self.build(self.to_list())
+
+    def make_2opt(self, a, b, c, d):
+        """
+        Удаляет дуги (a, b) и (c, d) и добавляет дуги (a, c) и (b, d).
+        Дуги должны быть ориентированы одинаково: b следует за a, а d за c, либо наоборот.
+        """
+        if self.next(a) == b:
+            self.reverse(b, c)
+        else:
+            self.reverse(a, d)
+
+    def to_list(self):
+        """Маршрут списком, начиная с точки 0"""
+        route = []
+        for segment in self.segments:
+            route.extend(segment.ordered())
+        start = route.index(0)
+        return route[start:] + route[:start]
+
+    def to_edges(self):
+        """Список дуг маршрута, начиная с точки 0"""
+        return route_to_edges(self.to_list())
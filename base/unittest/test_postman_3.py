@@ -0,0 +1,83 @@
+"""Модуль тестирования метода ветвей и границ Литтла (postman_3.find_optimal_route)
+сравнением с методом Хелда-Карпа (postman_4) на небольших наборах точек"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from distance import create_distance_matrix
+from postman_3 import find_optimal_route
+from postman_4 import solve_held_karp
+
+
+def calculate_length(matrix, edges):
+    """Возвращает длину маршрута, заданного списком дуг"""
+    return sum(matrix[i][j] for i, j in edges)
+
+
+class LittleTest(unittest.TestCase):
+    """Тесты для функции find_optimal_route модуля postman_3.py"""
+
+    def assert_route(self, matrix, edges):
+        """Проверяет, что дуги образуют один цикл через все точки"""
+        n = len(matrix)
+        succ = dict(edges)
+        self.assertEqual(sorted(succ), list(range(n)))
+        current, steps = succ[0], 1
+        while current != 0:
+            current, steps = succ[current], steps + 1
+        self.assertEqual(steps, n)
+
+    def test_symmetric_matches_held_karp(self):
+        """Тест на случайных точках: длина совпадает с методом Хелда-Карпа."""
+        rng = np.random.default_rng(0)
+        for n in range(2, 13):
+            for _ in range(5):
+                coords = rng.random((n, 2)) * 1000
+                matrix = create_distance_matrix(coords, diagonal=np.inf)
+                edges = find_optimal_route(matrix)
+                self.assert_route(matrix, edges)
+                expected = solve_held_karp(create_distance_matrix(coords))[1]
+                self.assertAlmostEqual(calculate_length(matrix, edges), expected, places=6)
+
+    def test_duplicate_points(self):
+        """Тест на точках с совпадающими координатами и целыми расстояниями."""
+        rng = np.random.default_rng(1)
+        for n in range(4, 12):
+            coords = np.round(rng.random((n, 2)) * 5)
+            matrix = create_distance_matrix(coords, diagonal=np.inf)
+            edges = find_optimal_route(matrix)
+            self.assert_route(matrix, edges)
+            expected = solve_held_karp(create_distance_matrix(coords))[1]
+            self.assertAlmostEqual(calculate_length(matrix, edges), expected, places=6)
+
+    def test_asymmetric_matches_held_karp(self):
+        """Тест на несимметричной матрице: 1-дерево не используется, ответ тот же."""
+        rng = np.random.default_rng(2)
+        for n in range(3, 11):
+            matrix = rng.random((n, n)) * 100
+            np.fill_diagonal(matrix, np.inf)
+            edges = find_optimal_route(matrix)
+            self.assert_route(matrix, edges)
+            expected = solve_held_karp(np.where(np.isinf(matrix), 0, matrix))[1]
+            self.assertAlmostEqual(calculate_length(matrix, edges), expected, places=6)
+
+    def test_upper_bound_without_route(self):
+        """Тест рекорда без маршрута: если короче рекорда маршрута нет, возвращается None."""
+        coords = np.random.default_rng(3).random((8, 2)) * 100
+        matrix = create_distance_matrix(coords, diagonal=np.inf)
+        optimum = calculate_length(matrix, find_optimal_route(matrix))
+        self.assertIsNone(find_optimal_route(matrix, upper_bound=optimum - 1e-6))
+        edges = find_optimal_route(matrix, upper_bound=optimum + 1.0)
+        self.assertAlmostEqual(calculate_length(matrix, edges), optimum, places=6)
+
+    def test_single_point(self):
+        """Тест набора из одной точки."""
+        self.assertEqual(find_optimal_route(np.full((1, 1), np.inf)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()